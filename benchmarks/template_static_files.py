@@ -0,0 +1,65 @@
+"""Measures the number of requests per second served by TemplateStaticFileHandler, and the
+number of static file paths resolved per second (as done for every asset URL in a render).
+
+Run with ``python benchmarks/template_static_files.py``. The uncached numbers are obtained by
+clearing the memoized template hierarchies and static file paths before every request,
+which is what every request did before they were memoized.
+"""
+import time
+
+import tornado.httpclient
+import tornado.ioloop
+import tornado.web
+
+from voila import paths
+from voila.static_file_handler import TemplateStaticFileHandler
+
+REQUESTS = 2000
+URL_PATH = '/voila/templates/lab/static/require.min.js'
+
+
+def clear_caches():
+    paths._template_hierarchy_cache.clear()
+    TemplateStaticFileHandler._absolute_paths.clear()
+
+
+async def measure(port, cached):
+    client = tornado.httpclient.AsyncHTTPClient()
+    url = 'http://127.0.0.1:%d%s' % (port, URL_PATH)
+    await client.fetch(url)
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        if not cached:
+            clear_caches()
+        await client.fetch(url)
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def measure_resolve(cached):
+    path = URL_PATH.split('/', 3)[3]
+    TemplateStaticFileHandler.get_absolute_path(None, path)
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        if not cached:
+            clear_caches()
+        TemplateStaticFileHandler.get_absolute_path(None, path)
+    return REQUESTS / (time.perf_counter() - start)
+
+
+async def main():
+    app = tornado.web.Application([
+        (r'/voila/templates/(.*)', TemplateStaticFileHandler),
+    ], static_handler_class=TemplateStaticFileHandler)
+    server = app.listen(0, '127.0.0.1')
+    port = list(server._sockets.values())[0].getsockname()[1]
+    uncached = await measure(port, cached=False)
+    cached = await measure(port, cached=True)
+    print('uncached: %10.1f requests/s' % uncached)
+    print('cached:   %10.1f requests/s' % cached)
+    server.stop()
+    print('uncached: %10.1f paths resolved/s' % measure_resolve(cached=False))
+    print('cached:   %10.1f paths resolved/s' % measure_resolve(cached=True))
+
+
+if __name__ == '__main__':
+    tornado.ioloop.IOLoop.current().run_sync(main)
@@ -233,9 +233,13 @@ setup_args = {
         'jupyter_server>=0.3.0,<2.0.0',
         'jupyter_client>=6.1.3,<7',
         'nbclient>=0.4.0,<0.6',
-        'nbconvert>=6.0.0,<7'
+        'nbconvert>=6.0.0,<7',
+        'prometheus_client'
     ],
     'extras_require': {
+        'brotli': [
+            'brotli'
+        ],
         'test': [
             'mock',
             'pytest',
@@ -10,6 +10,16 @@
 require([window.voila_js_url || 'static/voila'], function(voila) {
     // requirejs doesn't like to be passed an async function, so create one inside
     (async function() {
+        var config = document.getElementById('jupyter-config-data')
+        if (config && !JSON.parse(config.textContent).kernelId) {
+            // the page was rendered from a snapshot, there is no kernel to connect to
+            if (document.readyState === 'complete') {
+                voila.renderMathJax()
+            } else {
+                window.addEventListener('load', function() { voila.renderMathJax() });
+            }
+            return
+        }
         var kernel = await voila.connectKernel()
 
         const context = {
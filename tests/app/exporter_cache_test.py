@@ -0,0 +1,28 @@
+# test that the exporters, and their compiled templates, are shared by requests
+import pytest
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--VoilaConfiguration.allow_theme_override=YES']
+
+
+async def test_exporter_cache(app, http_server_client, base_url):
+    exporters = app.settings['voila_exporters']
+    response = await http_server_client.fetch(base_url)
+    assert response.code == 200
+    assert 'Hi Voilà' in response.body.decode('utf-8')
+    assert len(exporters) == 1
+    exporter, = [exporters.get(key) for key in exporters.keys()]
+    template = exporter.template
+
+    response = await http_server_client.fetch(base_url)
+    assert response.code == 200
+    assert 'Hi Voilà' in response.body.decode('utf-8')
+    assert len(exporters) == 1
+    assert exporter.template is template
+
+    response = await http_server_client.fetch(base_url + '?voila-theme=dark')
+    assert response.code == 200
+    assert 'theme-dark' in response.body.decode('utf-8')
+    assert len(exporters) == 2
@@ -0,0 +1,40 @@
+# test that the snippets of a page are flushed in batches, and before the execution of each cell
+import os
+
+import nbformat
+import pytest
+
+from voila.handler import VoilaHandler
+
+
+@pytest.fixture
+def voila_notebook(tmp_path):
+    cells = [nbformat.v4.new_markdown_cell('# Section %d' % i) for i in range(50)]
+    cells += [nbformat.v4.new_code_cell('print("first")'), nbformat.v4.new_code_cell('print("second")')]
+    nb = nbformat.v4.new_notebook(cells=cells)
+    nb.metadata.kernelspec = {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}
+    path = os.path.join(str(tmp_path), 'sections.ipynb')
+    nbformat.write(nb, path)
+    return path
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--VoilaConfiguration.flush_interval=60', '--VoilaConfiguration.stream_partial_outputs=False']
+
+
+async def test_flush(http_server_client, base_url, monkeypatch):
+    flushes = []
+    flush = VoilaHandler.flush
+
+    def counting_flush(self, *args, **kwargs):
+        flushes.append(self.unflushed_size)
+        return flush(self, *args, **kwargs)
+    monkeypatch.setattr(VoilaHandler, 'flush', counting_flush)
+
+    response = await http_server_client.fetch(base_url)
+    html_text = response.body.decode('utf-8')
+    assert 'Section 49' in html_text
+    assert 'second' in html_text
+    # before the kernel start, before each code cell, and at the end (finish flushes nothing)
+    assert len([size for size in flushes if size > 0]) == 4
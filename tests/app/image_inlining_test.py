@@ -23,3 +23,16 @@ async def test_image_inlining(http_server_client, base_url, notebook_directory):
         svg_data = f.read()
     svg_data_base64 = base64.b64encode(svg_data).decode('ascii')
     assert svg_data_base64 in html_text
+
+
+async def test_image_inlining_cache(voila_app, http_server_client, base_url):
+    cache = voila_app.markdown_image_cache
+    response = await http_server_client.fetch(base_url)
+    assert 'data:image/svg+xml;base64,' in response.body.decode('utf-8')
+    misses = cache.stats['misses']
+    hits = cache.stats['hits']
+
+    response = await http_server_client.fetch(base_url)
+    assert 'data:image/svg+xml;base64,' in response.body.decode('utf-8')
+    assert cache.stats['misses'] == misses
+    assert cache.stats['hits'] > hits
@@ -0,0 +1,28 @@
+# test that markdown images can be referred to by a cacheable url instead of being inlined
+import hashlib
+import os
+
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(notebook_directory):
+    return os.path.join(notebook_directory, 'images.ipynb')
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--VoilaConfiguration.inline_markdown_images=False']
+
+
+async def test_image_urls(http_server_client, base_url, notebook_directory):
+    response = await http_server_client.fetch(base_url)
+    html_text = response.body.decode('utf-8')
+    with open(os.path.join(notebook_directory, 'jupyter.svg'), 'rb') as f:
+        svg_data = f.read()
+    url = base_url + 'voila/files/jupyter.svg?v=' + hashlib.sha512(svg_data).hexdigest()
+    assert '<img src="%s" alt="from disk"' % url in html_text
+
+    response = await http_server_client.fetch(url)
+    assert response.body == svg_data
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
@@ -0,0 +1,32 @@
+# test that the contents manager and the markdown cells are used in the threads of the IOExecutor, except for
+# the notebook reads that check its trust
+import os
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(notebook_directory):
+    return os.path.join(notebook_directory, 'images.ipynb')
+
+
+async def test_io_executor(http_server_client, voila_app, base_url, monkeypatch):
+    threads = []
+    get = voila_app.contents_manager.get
+
+    def recording_get(*args, **kwargs):
+        reads_notebook = str(kwargs.get('path', args[0] if args else '')).endswith('.ipynb') and kwargs.get('content', True)
+        threads.append((reads_notebook, threading.current_thread().name))
+        return get(*args, **kwargs)
+    monkeypatch.setattr(voila_app.contents_manager, 'get', recording_get)
+
+    response = await http_server_client.fetch(base_url)
+    assert 'data:image/svg+xml;base64,' in response.body.decode('utf-8')
+    assert threads
+    assert all(name.startswith('voila-io') for reads_notebook, name in threads if not reads_notebook)
+    assert all(name == threading.main_thread().name for reads_notebook, name in threads if reads_notebook)
+    stats = voila_app.io_executor.stats
+    for name in ['contents.get', 'contents.stat', 'markdown']:
+        assert stats[name]['calls'] > 0
+        assert stats[name]['seconds'] >= stats[name]['max_seconds'] > 0
@@ -0,0 +1,46 @@
+# test that the kernels of pages without a websocket connection are culled
+import asyncio
+import re
+
+import pytest
+
+
+@pytest.fixture
+def voila_args_extra():
+    return [
+        '--VoilaConfiguration.cull_unconnected_timeout=1',
+        '--VoilaConfiguration.cull_interval=1',
+        '--VoilaExecutor.timeout=240'
+    ]
+
+
+async def test_cull_unconnected(voila_app, http_server_client, base_url):
+    response = await http_server_client.fetch(base_url)
+    assert response.code == 200
+    pattern = r"""kernelId": ["']([0-9a-zA-Z-]+)["']"""
+    kernel_id = re.findall(pattern, response.body.decode('utf-8'))[0]
+    assert kernel_id in voila_app.kernel_manager
+
+    # nobody connects to the kernel, so it should be culled
+    for i in range(100):
+        if kernel_id not in voila_app.kernel_manager:
+            break
+        await asyncio.sleep(0.1)
+    assert kernel_id not in voila_app.kernel_manager
+    assert voila_app.kernel_culler.culled['unconnected'] == 1
+
+
+@pytest.mark.parametrize('voila_args_extra', [['--VoilaConfiguration.cull_idle_timeout=1', '--VoilaConfiguration.cull_interval=1']], ids=['idle'])
+async def test_cull_idle(voila_app, http_server_client, base_url):
+    response = await http_server_client.fetch(base_url)
+    assert response.code == 200
+    pattern = r"""kernelId": ["']([0-9a-zA-Z-]+)["']"""
+    kernel_id = re.findall(pattern, response.body.decode('utf-8'))[0]
+
+    # the kernel does not send any message once the page is rendered
+    for i in range(100):
+        if kernel_id not in voila_app.kernel_manager:
+            break
+        await asyncio.sleep(0.1)
+    assert kernel_id not in voila_app.kernel_manager
+    assert voila_app.kernel_culler.culled['idle'] == 1
@@ -0,0 +1,43 @@
+# test that kernels are taken from the pool, and get the request specific environment
+import asyncio
+import os
+import re
+
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(notebook_directory):
+    return os.path.join(notebook_directory, 'cgi.ipynb')
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--KernelPool.pool_size=1', '--KernelPool.fill_delay=0', '--VoilaExecutor.timeout=240']
+
+
+def get_kernel_id(html_text):
+    pattern = r"""kernelId": ["']([0-9a-zA-Z-]+)["']"""
+    return re.findall(pattern, html_text)[0]
+
+
+async def test_kernel_from_pool(voila_app, http_server_client, base_url):
+    response = await http_server_client.fetch(base_url + '?username=first')
+    assert response.code == 200
+    assert 'first' in response.body.decode('utf-8')
+
+    pools = voila_app.kernel_pool._pools
+    while not any(pools.values()):
+        await asyncio.sleep(0.1)
+    pooled_kernel_ids = [entry[0] for pool in pools.values() for entry in pool]
+
+    response = await http_server_client.fetch(base_url + '?username=second')
+    html_text = response.body.decode('utf-8')
+    assert response.code == 200
+    assert 'second' in html_text, 'request environment should be injected in the pooled kernel'
+    assert 'first' not in html_text
+    assert get_kernel_id(html_text) in pooled_kernel_ids
+
+    # let the pool refill, so that no kernel is starting when the server stops
+    while voila_app.kernel_pool._filling:
+        await asyncio.sleep(0.1)
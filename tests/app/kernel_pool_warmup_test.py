@@ -0,0 +1,97 @@
+# test that the warmup cells of a notebook are executed ahead of time in the pooled kernels
+import asyncio
+import os
+
+import nbformat
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(notebook_directory):
+    return os.path.join(notebook_directory, 'warmup.ipynb')
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--KernelPool.pool_size=1', '--KernelPool.fill_delay=0', '--VoilaExecutor.timeout=240']
+
+
+async def prefilled_key(kernel_pool):
+    # the pool for the notebook is filled when Voilà starts
+    for i in range(300):
+        key = kernel_pool._notebook_keys.get(('python3', '', 'warmup.ipynb'))
+        if key is not None and kernel_pool._pools.get(key):
+            return key
+        await asyncio.sleep(0.1)
+    assert False, 'the kernel pool was not filled'
+
+
+async def test_warmup_cells(http_server_client, voila_app, base_url):
+    await prefilled_key(voila_app.kernel_pool)
+
+    response = await http_server_client.fetch(base_url + '?username=first')
+    html_text = response.body.decode('utf-8')
+    assert response.code == 200
+    assert 'warmup query string: None' in html_text, 'the warmup cell should have been executed before the request'
+    assert 'render query string: username=first' in html_text
+    assert 'The cell above is executed ahead of time' in html_text
+
+    # let the pool refill, so that no kernel is starting when the server stops
+    while voila_app.kernel_pool._filling:
+        await asyncio.sleep(0.1)
+
+
+async def wait_for_pool(kernel_pool, key):
+    for i in range(300):
+        if kernel_pool._pools.get(key):
+            break
+        await asyncio.sleep(0.1)
+    assert kernel_pool._pools.get(key)
+
+
+async def test_warmup_cells_modified(voila_app, voila_notebook):
+    kernel_pool = voila_app.kernel_pool
+    nb = nbformat.read(voila_notebook, as_version=4)
+    key = await prefilled_key(kernel_pool)
+    kernel_id = kernel_pool._pools[key][0][0]
+
+    # the kernels that executed the previous warmup cells are not used anymore
+    nb.cells[0].source += '\nprint("modified")'
+    assert await kernel_pool.get('python3', '', nb, 'warmup.ipynb') is None
+    assert key not in kernel_pool._pools
+    assert key not in kernel_pool._warmup
+    for i in range(100):
+        if kernel_id not in voila_app.kernel_manager:
+            break
+        await asyncio.sleep(0.1)
+    assert kernel_id not in voila_app.kernel_manager
+
+    new_key, = kernel_pool._pools.keys()
+    await wait_for_pool(kernel_pool, new_key)
+
+
+async def test_warmup_failure_retried(voila_app, voila_notebook):
+    kernel_pool = voila_app.kernel_pool
+    nb = nbformat.read(voila_notebook, as_version=4)
+    await prefilled_key(kernel_pool)
+    nb.cells[0].source = 'raise ValueError("warehouse not available")'
+    await kernel_pool.get('python3', '', nb, 'warmup.ipynb')
+    key, = kernel_pool._pools.keys()
+    for i in range(300):
+        if key in kernel_pool._failures:
+            break
+        await asyncio.sleep(0.1)
+    failures, retry_at = kernel_pool._failures[key]
+    assert failures == 1
+    assert not kernel_pool._pools[key]
+
+    # not retried before the delay
+    kernel_pool.fill(key)
+    assert key not in kernel_pool._filling
+    # but retried after it
+    kernel_pool._failures[key] = (failures, 0)
+    kernel_pool.fill(key)
+    assert key in kernel_pool._filling
+    while kernel_pool._filling:
+        await asyncio.sleep(0.1)
+    assert kernel_pool._failures[key][0] == 2
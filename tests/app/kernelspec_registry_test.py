@@ -0,0 +1,25 @@
+# test that the kernel specs are discovered once, and used to find a kernel for the language of a notebook
+import os
+
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(notebook_directory):
+    return os.path.join(notebook_directory, 'non_existing_kernel.ipynb')
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--NotebookCache.max_size=0', '--KernelSpecRegistry.ttl=3600']
+
+
+async def test_kernelspec_registry(voila_app, http_server_client, base_url):
+    for i in range(2):
+        response = await http_server_client.fetch(base_url)
+        assert response.code == 200
+        assert 'non-existing kernel' in response.body.decode('utf-8')
+    assert voila_app.kernelspec_registry.fetches == 1
+    # the kernel.json files are read in a thread
+    assert voila_app.io_executor.stats['kernelspecs']['calls'] == 1
+    assert await voila_app.kernelspec_registry.find_kernel_name('Python') == 'python3'
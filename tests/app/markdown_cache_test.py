@@ -0,0 +1,44 @@
+# test that the html of the markdown cells is cached, and rendered again when an image changes
+import base64
+import os
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def notebook_directory(tmp_path, notebook_directory):
+    for name in ['images.ipynb', 'jupyter.svg']:
+        shutil.copy(os.path.join(notebook_directory, name), str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def voila_notebook(notebook_directory):
+    return os.path.join(notebook_directory, 'images.ipynb')
+
+
+async def test_markdown_cache(http_server_client, voila_app, base_url, notebook_directory):
+    cache = voila_app.markdown_cache
+    response = await http_server_client.fetch(base_url)
+    assert 'data:image/svg+xml;base64,' in response.body.decode('utf-8')
+    misses = cache.stats['misses']
+    hits = cache.stats['hits']
+    assert misses > 0
+
+    response = await http_server_client.fetch(base_url)
+    assert 'data:image/svg+xml;base64,' in response.body.decode('utf-8')
+    assert cache.stats['misses'] == misses
+    assert cache.stats['hits'] > hits
+
+    svg_path = os.path.join(notebook_directory, 'jupyter.svg')
+    with open(svg_path, 'rb') as f:
+        svg_data = f.read().replace(b'</svg>', b'<!-- modified --></svg>')
+    with open(svg_path, 'wb') as f:
+        f.write(svg_data)
+    # make sure the modification time changes on coarse file systems
+    stat = os.stat(svg_path)
+    os.utime(svg_path, (stat.st_atime, stat.st_mtime + 10))
+
+    response = await http_server_client.fetch(base_url)
+    assert base64.b64encode(svg_data).decode('ascii') in response.body.decode('utf-8')
@@ -0,0 +1,56 @@
+# test the Prometheus metrics served at /voila/metrics
+import re
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from voila import metrics
+
+
+def samples(text):
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+async def test_metrics(http_server_client, base_url):
+    response = await http_server_client.fetch(base_url)
+    assert response.code == 200
+    response = await http_server_client.fetch(base_url + 'voila/metrics')
+    assert response.code == 200
+    assert response.headers['Content-Type'].startswith('text/plain')
+    metrics = samples(response.body.decode('utf-8'))
+
+    labels = (('notebook', 'print.ipynb'),)
+    for name in ['voila_time_to_first_byte_seconds', 'voila_kernel_start_seconds', 'voila_kernel_wait_for_ready_seconds',
+                 'voila_cell_execution_seconds', 'voila_render_seconds']:
+        assert metrics[(name + '_count', labels)] >= 1
+        assert metrics[(name + '_sum', labels)] > 0
+    assert metrics[('voila_streamed_bytes_total', ())] > 0
+    # the page is rendered, the metrics are not a render
+    assert metrics[('voila_renders_in_progress', ())] == 0
+    assert metrics[('voila_kernels', ())] == 1
+    assert metrics[('voila_websockets', ())] == 0
+    assert metrics[('voila_cache_misses_total', (('cache', 'notebook'),))] >= 1
+    assert metrics[('voila_io_calls_total', (('call', 'contents.get'),))] >= 1
+    assert ('voila_render_queue_admitted_total', ()) in metrics
+
+
+async def test_metrics_render_time(http_server_client, base_url):
+    # a page served from the notebook cache is still rendered with a kernel
+    await http_server_client.fetch(base_url)
+    await http_server_client.fetch(base_url)
+    response = await http_server_client.fetch(base_url + 'voila/metrics')
+    text = response.body.decode('utf-8')
+    counts = re.findall(r'^voila_render_seconds_count\{notebook="print.ipynb"\} (\S+)$', text, re.MULTILINE)
+    assert len(counts) == 1 and float(counts[0]) >= 2
+
+
+def test_notebook_label(monkeypatch):
+    monkeypatch.setattr(metrics, '_notebook_labels', set())
+    monkeypatch.setattr(metrics, 'MAX_NOTEBOOK_LABELS', 2)
+    assert metrics.notebook_label('a.ipynb') == 'a.ipynb'
+    assert metrics.notebook_label('b.ipynb') == 'b.ipynb'
+    assert metrics.notebook_label('c.ipynb') == 'other'
+    assert metrics.notebook_label('a.ipynb') == 'a.ipynb'
@@ -17,3 +17,4 @@ async def test_no_strip_sources(http_server_client, base_url):
     html_text = response.body.decode('utf-8')
     assert 'Hi Voilà' in html_text
     assert 'print' in html_text, 'the source code should *NOT* be stripped'
+    assert '<span class="nb">print</span>' in html_text, 'the source code should be highlighted'
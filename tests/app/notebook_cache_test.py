@@ -0,0 +1,34 @@
+# test that notebooks are loaded once, until the file is modified
+import os
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(notebook_directory, tmpdir):
+    path = os.path.join(str(tmpdir), 'print.ipynb')
+    shutil.copy(os.path.join(notebook_directory, 'print.ipynb'), path)
+    return path
+
+
+async def test_notebook_cache(voila_app, voila_notebook, http_server_client, base_url):
+    stats = voila_app.notebook_cache.stats
+    response = await http_server_client.fetch(base_url)
+    assert response.code == 200
+    assert 'Hi Voilà' in response.body.decode('utf-8')
+    assert voila_app.notebook_cache.stats['misses'] == stats['misses'] + 1
+
+    response = await http_server_client.fetch(base_url)
+    assert 'Hi Voilà' in response.body.decode('utf-8')
+    assert voila_app.notebook_cache.stats['hits'] == stats['hits'] + 1
+    assert voila_app.notebook_cache.stats['entries'] == 1
+
+    with open(voila_notebook) as f:
+        content = f.read()
+    with open(voila_notebook, 'w') as f:
+        f.write(content.replace("'Hi '", "'Hello '"))
+    response = await http_server_client.fetch(base_url)
+    assert 'Hello Voilà' in response.body.decode('utf-8')
+    assert voila_app.notebook_cache.stats['misses'] == stats['misses'] + 2
+    assert voila_app.notebook_cache.stats['entries'] == 1
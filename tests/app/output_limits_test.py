@@ -0,0 +1,60 @@
+# test that the stream outputs are coalesced, and that the outputs are truncated beyond their size limits
+import os
+
+import nbformat
+import pytest
+
+from voila.execute import VoilaExecutor
+
+
+@pytest.fixture
+def voila_notebook(tmp_path):
+    sources = [
+        'for i in range(100):\n    print("line %d" % i)',
+        'from IPython.display import clear_output\nfor i in range(200):\n    clear_output(wait=True)\n    print("%d" % i + "x" * 100)',
+        'print("a" * 2000)',
+    ] + ['print("b" * 900)'] * 6
+    nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell(source) for source in sources])
+    nb.metadata.kernelspec = {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}
+    path = os.path.join(str(tmp_path), 'outputs.ipynb')
+    nbformat.write(nb, path)
+    return path
+
+
+@pytest.fixture
+def voila_args_extra():
+    return [
+        '--VoilaExecutor.max_cell_output_size=1000',
+        '--VoilaExecutor.max_notebook_output_size=5000',
+        '--VoilaConfiguration.stream_partial_outputs=False',
+    ]
+
+
+async def test_output_limits(http_server_client, base_url):
+    response = await http_server_client.fetch(base_url)
+    html_text = response.body.decode('utf-8')
+    # the lines printed in a loop are a single output
+    assert html_text.count('line 0\nline 1\n') == 1
+    assert html_text.count('line 99') == 1
+    # the outputs cleared with clear_output(wait=True) do not count
+    assert '199' + 'x' * 100 in html_text
+    # the cell printing 2000 characters, and the cells printed once the notebook reached its limit
+    assert html_text.count('voila-output-truncated') == 4
+    assert 'a' * 1000 in html_text
+    assert 'a' * 1001 not in html_text
+    assert 'b' * 900 in html_text
+    assert html_text.count('b') < 5000
+
+
+def test_coalesce_carriage_returns():
+    executor = VoilaExecutor(nbformat.v4.new_notebook(), km=None)
+    executor.reset_execution_trackers()
+    executor.clear_before_next_output = False
+    outs = []
+    # a progress bar, whose carriage returns are split across messages
+    for text in ['start\nprogress 1', '\rprogress 2', '\r', 'progress 3\ndone\n']:
+        msg = {'msg_type': 'stream', 'header': {'msg_type': 'stream'}, 'parent_header': {'msg_id': 'id'}, 'content': {'name': 'stdout', 'text': text}}
+        executor.output(outs, msg, None, 0)
+    assert len(outs) == 1
+    assert outs[0].text == 'start\nprogress 3\ndone\n'
+    assert executor.output_sizes[0] == len(outs[0].text)
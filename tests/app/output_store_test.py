@@ -0,0 +1,68 @@
+# test that the large outputs are served by url, instead of being inlined in the page
+import base64
+import hashlib
+import os
+import re
+
+import nbformat
+import pytest
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 5000
+HTML = '<table>' + '<tr><td>a cell of a large table</td></tr>' * 100 + '</table>'
+
+
+@pytest.fixture
+def voila_notebook(tmp_path):
+    source = '\n'.join([
+        'from IPython.display import HTML, display',
+        'display({{"image/png": "{}"}}, raw=True)'.format(base64.b64encode(PNG).decode('ascii')),
+        'display(HTML({!r}))'.format(HTML),
+        'display(HTML({!r}))'.format(HTML),
+        'display(HTML("a small output"))',
+    ])
+    nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell(source)])
+    nb.metadata.kernelspec = {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}
+    path = os.path.join(str(tmp_path), 'outputs.ipynb')
+    nbformat.write(nb, path)
+    return path
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--OutputStore.threshold=1000']
+
+
+async def test_output_store(http_server_client, voila_app, base_url):
+    response = await http_server_client.fetch(base_url)
+    html_text = response.body.decode('utf-8')
+    assert 'a small output' in html_text
+    assert 'a cell of a large table' not in html_text
+    assert base64.b64encode(PNG).decode('ascii') not in html_text
+
+    html_urls = set(re.findall(r'data-voila-output-url="([^"]+)"', html_text))
+    # the outputs are loaded by a script that watches the nodes inserted after it, such as partial outputs
+    assert html_text.index('MutationObserver') < html_text.index('data-voila-output-url="')
+    image_urls = set(re.findall(r'<img src="([^"]*/voila/outputs/[^"]+)"', html_text))
+    # the identical outputs are stored once
+    assert len(html_urls) == 1
+    assert len(image_urls) == 1
+    html_url, = html_urls
+    image_url, = image_urls
+    assert voila_app.output_store.stats['entries'] == 2
+
+    response = await http_server_client.fetch(html_url)
+    assert response.body.decode('utf-8') == HTML
+    assert response.headers['Content-Type'].startswith('text/html')
+    assert 'immutable' in response.headers['Cache-Control']
+
+    response = await http_server_client.fetch(image_url)
+    assert response.body == PNG
+    assert response.headers['Content-Type'] == 'image/png'
+    etag = response.headers['Etag']
+    assert hashlib.sha256(b'image/png\n' + PNG).hexdigest() in etag
+
+    response = await http_server_client.fetch(image_url, headers={'If-None-Match': etag}, raise_error=False)
+    assert response.code == 304
+
+    response = await http_server_client.fetch(base_url + 'voila/outputs/' + '0' * 64, raise_error=False)
+    assert response.code == 404
@@ -0,0 +1,62 @@
+# test that the pages of notebooks that opted in are cached, and served without a kernel
+import asyncio
+import os
+
+import nbformat
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(tmp_path):
+    nb = nbformat.v4.new_notebook(cells=[
+        nbformat.v4.new_code_cell('import os, uuid\nprint("render", uuid.uuid4().hex, os.environ["QUERY_STRING"])')
+    ])
+    nb.metadata.kernelspec = {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}
+    path = os.path.join(str(tmp_path), 'report.ipynb')
+    nbformat.write(nb, path)
+    return path
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--VoilaConfiguration.page_cache_ttl=60']
+
+
+async def test_page_cache(http_server_client, voila_app, base_url):
+    cache = voila_app.page_cache
+    first, second = await asyncio.gather(http_server_client.fetch(base_url), http_server_client.fetch(base_url))
+    # the concurrent requests are collapsed into a single render
+    assert first.body == second.body
+    assert b'render ' in first.body
+    assert cache.stats['entries'] == 1
+    # the kernel of the cached page is not used, and the page does not connect to it
+    assert voila_app.kernel_manager.list_kernel_ids() == []
+    assert b'"kernelId": ""' in first.body
+
+    response = await http_server_client.fetch(base_url)
+    assert response.body == first.body
+
+    response = await http_server_client.fetch(base_url + '?b=2&a=1')
+    assert response.body != first.body
+    assert b'b=2&amp;a=1' in response.body
+    response_sorted = await http_server_client.fetch(base_url + '?a=1&b=2')
+    assert response_sorted.body == response.body
+    assert cache.stats['entries'] == 2
+
+
+@pytest.mark.parametrize('voila_args_extra', [[]], ids=['metadata'])
+async def test_page_cache_metadata(http_server_client, voila_app, voila_notebook, base_url):
+    cache = voila_app.page_cache
+    # the notebook did not opt in, the page cache is not used
+    await http_server_client.fetch(base_url)
+    assert cache.stats['misses'] == 0
+    assert cache.stats['entries'] == 0
+
+    nb = nbformat.read(voila_notebook, as_version=4)
+    nb.metadata.voila = {'page_cache_ttl': 60}
+    nbformat.write(nb, voila_notebook)
+    # the first render since the notebook opted in is cached
+    first = await http_server_client.fetch(base_url)
+    assert cache.stats['entries'] == 1
+    response = await http_server_client.fetch(base_url)
+    assert response.body == first.body
@@ -0,0 +1,31 @@
+# test that the pages are compressed while they are streamed
+import gzip
+
+import pytest
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--VoilaConfiguration.page_gzip_level=9']
+
+
+async def test_page_compression(http_server_client, base_url):
+    response = await http_server_client.fetch(base_url, headers={'Accept-Encoding': 'gzip'}, decompress_response=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    html_text = gzip.decompress(response.body).decode('utf-8')
+    assert 'Hi Voilà' in html_text
+    assert html_text.rstrip().endswith('</html>')
+
+    response = await http_server_client.fetch(base_url, headers={'Accept-Encoding': 'identity'}, decompress_response=False)
+    assert 'Content-Encoding' not in response.headers
+    assert 'Hi Voilà' in response.body.decode('utf-8')
+
+
+async def test_page_compression_brotli(http_server_client, base_url):
+    brotli = pytest.importorskip('brotli')
+    response = await http_server_client.fetch(base_url, headers={'Accept-Encoding': 'gzip, br'}, decompress_response=False)
+    assert response.headers['Content-Encoding'] == 'br'
+    html_text = brotli.decompress(response.body).decode('utf-8')
+    assert 'Hi Voilà' in html_text
+    assert html_text.rstrip().endswith('</html>')
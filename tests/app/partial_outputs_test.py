@@ -0,0 +1,28 @@
+# test that the outputs of a cell are sent while it is executed
+import os
+
+import nbformat
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(tmp_path):
+    source = 'import time\nprint("first output", flush=True)\ntime.sleep(1)\nprint("second output")'
+    nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell(source)])
+    nb.metadata.kernelspec = {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}
+    path = os.path.join(str(tmp_path), 'slow.ipynb')
+    nbformat.write(nb, path)
+    return path
+
+
+async def test_partial_outputs(http_server_client, base_url):
+    response = await http_server_client.fetch(base_url)
+    html_text = response.body.decode('utf-8')
+    partial = html_text.index('class="voila-partial-output" data-voila-cell="0"')
+    first_chunk = html_text[partial:html_text.index('voila_partial_output(0)', partial)]
+    removed = html_text.rindex('document.querySelectorAll(\'[data-voila-cell="0"]\')')
+    # the first output is sent alone, while the cell sleeps
+    assert 'first output' in first_chunk
+    assert 'second output' not in first_chunk
+    # the partial outputs are removed before the cell is rendered with all its outputs
+    assert html_text.index('first output', removed) < html_text.index('second output', removed)
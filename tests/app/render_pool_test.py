@@ -0,0 +1,47 @@
+# test that the markdown cells and the inputs of the code cells are rendered in the worker processes of the RenderPool
+import os
+import re
+
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(notebook_directory):
+    return os.path.join(notebook_directory, 'images.ipynb')
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--RenderPool.processes=1', '--VoilaConfiguration.strip_sources=False', '--VoilaExecutor.timeout=240']
+
+
+def images(html_text):
+    return sorted(re.findall(r'<img [^>]*>', html_text))
+
+
+async def test_render_pool_markdown(http_server_client, voila_app, base_url):
+    response = await http_server_client.fetch(base_url)
+    html_text = response.body.decode('utf-8')
+    assert 'data:image/svg+xml;base64,' in html_text
+    assert 'data:image/png;base64,' in html_text
+    assert voila_app.render_pool.stats['markdown']['calls'] == 3
+
+    # the markdown cells are not rendered again while the images are unchanged
+    response = await http_server_client.fetch(base_url)
+    assert images(response.body.decode('utf-8')) == images(html_text)
+    assert voila_app.render_pool.stats['markdown']['calls'] == 3
+
+    # the same html is rendered in the server process
+    voila_app.markdown_cache.clear()
+    voila_app.render_pool.processes = 0
+    response = await http_server_client.fetch(base_url)
+    assert images(response.body.decode('utf-8')) == images(html_text)
+
+
+@pytest.mark.parametrize('voila_notebook', [os.path.join(os.path.dirname(__file__), '..', 'notebooks', 'print.ipynb')], ids=['print'])
+async def test_render_pool_highlight(http_server_client, voila_app, base_url):
+    response = await http_server_client.fetch(base_url)
+    html_text = response.body.decode('utf-8')
+    assert 'Hi Voilà' in html_text
+    assert '<span class="nb">print</span>' in html_text, 'the source code should be highlighted'
+    assert voila_app.render_pool.stats['highlight']['calls'] > 0
@@ -0,0 +1,33 @@
+# test that renders above the limits are queued, and rejected once the queue is full
+import asyncio
+import os
+
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(notebook_directory):
+    return os.path.join(notebook_directory, 'print.ipynb')
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--VoilaConfiguration.max_concurrent_renders=1', '--VoilaConfiguration.render_queue_size=1',
+            '--VoilaConfiguration.render_queue_retry_after=42']
+
+
+async def test_render_queue(voila_app, http_server_client, base_url):
+    fetches = [http_server_client.fetch(base_url, raise_error=False) for i in range(3)]
+    responses = await asyncio.gather(*fetches)
+    codes = sorted(response.code for response in responses)
+    assert codes == [200, 200, 503]
+    rejected, = [response for response in responses if response.code == 503]
+    assert rejected.headers['Retry-After'] == '42'
+    queued = [response for response in responses if 'voila_queue(1)' in response.body.decode('utf-8')]
+    assert len(queued) == 1
+
+    stats = voila_app.render_queue.stats
+    assert stats['running'] == 0
+    assert stats['depth'] == 0
+    assert stats['admitted'] == 2
+    assert stats['rejected'] == 1
@@ -0,0 +1,74 @@
+# test that rendered pages are kept on disk, and that the store evicts the least recently used entries
+import asyncio
+import os
+
+import nbformat
+import pytest
+
+from voila.snapshot_store import SnapshotStore
+
+
+@pytest.fixture
+def voila_notebook(tmp_path):
+    nb = nbformat.v4.new_notebook(cells=[
+        nbformat.v4.new_code_cell('import uuid\nprint("render", uuid.uuid4().hex)')
+    ])
+    nb.metadata.kernelspec = {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}
+    path = os.path.join(str(tmp_path), 'report.ipynb')
+    nbformat.write(nb, path)
+    return path
+
+
+@pytest.fixture
+def voila_args_extra(tmp_path):
+    return ['--VoilaConfiguration.page_cache_ttl=60', '--SnapshotStore.directory=%s' % os.path.join(str(tmp_path), 'store')]
+
+
+async def test_page_store(http_server_client, voila_app, base_url):
+    store = voila_app.snapshot_store
+    response = await http_server_client.fetch(base_url)
+    assert b'render ' in response.body
+    for i in range(100):
+        if store.stats['entries'] == 1:
+            break
+        await asyncio.sleep(0.1)
+    assert store.stats['entries'] == 1
+
+    # as after a restart, or in another process
+    voila_app.page_cache.clear()
+    response_stored = await http_server_client.fetch(base_url)
+    assert response_stored.body == response.body
+    assert voila_app.kernel_manager.list_kernel_ids() == []
+
+
+def test_snapshot_store(tmp_path):
+    store = SnapshotStore(directory=str(tmp_path), max_size=10)
+    store.put('a', b'12345', {'name': 'a'})
+    # the same content is stored once
+    store.put('b', b'12345')
+    assert store.stats == {'entries': 2, 'size': 5}
+    assert store.get('a') == (b'12345', {'name': 'a'})
+
+    store.put('c', b'abcdefgh')
+    # b is the least recently used entry, a is removed as well to make room
+    assert store.get('b') is None
+    assert store.get('a') is None
+    assert store.get('c') == (b'abcdefgh', {})
+    blobs = [name for root, dirs, files in os.walk(store.blob_directory) for name in files]
+    assert len(blobs) == 1
+
+    other_process = SnapshotStore(directory=str(tmp_path), max_size=10)
+    assert other_process.get('c') == (b'abcdefgh', {})
+    other_process.delete('c')
+    assert store.get('c') is None
+    assert store.stats == {'entries': 0, 'size': 0}
+
+
+def test_snapshot_store_eviction(tmp_path):
+    store = SnapshotStore(directory=str(tmp_path), max_size=1000)
+    for i in range(200):
+        store.put(str(i), b'%010d' % i)
+    # the least recently used entries are removed, until the files fit in the budget
+    assert store.stats == {'entries': 100, 'size': 1000}
+    assert store.get('99') is None
+    assert store.get('100') == (b'%010d' % 100, {})
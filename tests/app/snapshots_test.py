@@ -0,0 +1,71 @@
+# test that scheduled notebooks are rendered from a snapshot, executed in the background
+import asyncio
+import os
+
+import nbformat
+import pytest
+
+
+@pytest.fixture
+def voila_notebook(tmp_path):
+    nb = nbformat.v4.new_notebook(cells=[
+        nbformat.v4.new_code_cell('import uuid\nprint("executed", uuid.uuid4().hex)')
+    ])
+    nb.metadata.kernelspec = {'name': 'python3', 'display_name': 'Python 3', 'language': 'python'}
+    path = os.path.join(str(tmp_path), 'report.ipynb')
+    nbformat.write(nb, path)
+    return path
+
+
+@pytest.fixture
+def voila_args_extra(tmp_path):
+    return ['--SnapshotScheduler.notebooks={"report.ipynb": 3600}', '--SnapshotStore.directory=%s' % os.path.join(str(tmp_path), 'store')]
+
+
+async def test_snapshot(http_server_client, voila_app, base_url):
+    scheduler = voila_app.snapshot_scheduler
+    for i in range(240):
+        if scheduler.get('report.ipynb') is not None:
+            break
+        await asyncio.sleep(0.5)
+    assert scheduler.stats['report.ipynb']['error'] is None
+    assert scheduler.stats['report.ipynb']['duration'] > 0
+
+    first = await http_server_client.fetch(base_url)
+    second = await http_server_client.fetch(base_url)
+    assert b'executed ' in first.body
+    assert b'run live' in first.body
+    assert first.body == second.body
+    # the kernel of the snapshot was shut down, and the pages did not start one
+    assert voila_app.kernel_manager.list_kernel_ids() == []
+
+    live = await http_server_client.fetch(base_url + '?voila-live=1')
+    assert b'executed ' in live.body
+    assert b'run live' not in live.body
+    assert len(voila_app.kernel_manager.list_kernel_ids()) == 1
+
+
+async def test_snapshot_store_metrics(http_server_client, voila_app, base_url):
+    scheduler = voila_app.snapshot_scheduler
+    for i in range(240):
+        if voila_app.snapshot_store.stats['entries'] == 1:
+            break
+        await asyncio.sleep(0.5)
+    response = await http_server_client.fetch(base_url + 'voila/metrics')
+    text = response.body.decode('utf-8')
+    assert 'voila_snapshot_store_entries 1.0' in text
+    assert scheduler.stats['report.ipynb']['error'] is None
+    # the index of the store is read in a thread, not on the event loop
+    assert voila_app.io_executor.stats['snapshot_store.stats']['calls'] == 1
+
+
+async def test_snapshot_stop(http_server_client, voila_app, base_url):
+    scheduler = voila_app.snapshot_scheduler
+    # stop while the notebook is executed
+    for i in range(240):
+        if voila_app.kernel_manager.list_kernel_ids():
+            break
+        await asyncio.sleep(0.05)
+    await scheduler.stop()
+    assert voila_app.kernel_manager.list_kernel_ids() == []
+    assert scheduler.get('report.ipynb') is None
@@ -0,0 +1,77 @@
+# test that static files are served from memory, with conditional and range requests
+import asyncio
+import gzip
+import os
+
+import pytest
+import tornado
+
+from voila.static_cache import find_static_file
+
+
+@pytest.fixture
+def static_file(voila_app):
+    root, abspath = find_static_file(voila_app.static_paths, 'require.min.js')
+    return abspath
+
+
+async def test_static_asset_cache(voila_app, base_url, http_server_client, static_file):
+    cache = voila_app.static_asset_cache
+    url = f'{base_url}voila/static/require.min.js'
+    with open(static_file, 'rb') as f:
+        content = f.read()
+
+    response = await http_server_client.fetch(url)
+    assert response.body == content
+    assert cache.stats['entries'] == 1
+    hits = cache.stats['hits']
+
+    response_cached = await http_server_client.fetch(url)
+    assert response_cached.body == content
+    assert response_cached.headers['Etag'] == response.headers['Etag']
+    assert response_cached.headers['Last-Modified'] == response.headers['Last-Modified']
+    assert cache.stats['hits'] == hits + 1
+
+    with pytest.raises(tornado.httpclient.HTTPClientError, match='HTTP 304.*'):
+        await http_server_client.fetch(url, headers={'If-None-Match': response.headers['Etag']})
+
+    response_range = await http_server_client.fetch(url, headers={'Range': 'bytes=10-19'})
+    assert response_range.code == 206
+    assert response_range.body == content[10:20]
+
+
+async def test_static_asset_revalidate(voila_app, base_url, http_server_client, static_file):
+    cache = voila_app.static_asset_cache
+    await http_server_client.fetch(f'{base_url}voila/static/require.min.js')
+    assert cache.stats['entries'] == 1
+    cache.revalidate()
+    assert cache.stats['entries'] == 1
+    os.utime(static_file)
+    cache.revalidate()
+    assert cache.stats['entries'] == 0
+
+
+@pytest.mark.parametrize('url_path', ['voila/static/require.min.js', 'voila/templates/lab/static/require.min.js'])
+async def test_static_asset_compressed(voila_app, base_url, http_server_client, static_file, url_path):
+    url = base_url + url_path
+    with open(static_file, 'rb') as f:
+        content = f.read()
+    response = await http_server_client.fetch(url)
+    assert response.body == content
+    # the compressed variants are created in the background
+    for i in range(100):
+        if any(asset.encodings for key, asset in voila_app.static_asset_cache._cache.items()):
+            break
+        await asyncio.sleep(0.1)
+    assert any(asset.encodings for key, asset in voila_app.static_asset_cache._cache.items())
+
+    response = await http_server_client.fetch(url, headers={'Accept-Encoding': 'gzip'}, decompress_response=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert int(response.headers['Content-Length']) < len(content)
+    assert gzip.decompress(response.body) == content
+
+    response_identity = await http_server_client.fetch(url, headers={'Accept-Encoding': 'identity'}, decompress_response=False)
+    assert 'Content-Encoding' not in response_identity.headers
+    assert response_identity.body == content
+    assert response_identity.headers['Etag'] != response.headers['Etag']
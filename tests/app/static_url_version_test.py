@@ -0,0 +1,67 @@
+# test that the static urls in the page carry the hash of the content, and are cached forever
+import hashlib
+import os
+import re
+
+import pytest
+import tornado
+
+from voila.exporter import VoilaExporter
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    extension_dir = tmp_path / 'nbextensions' / 'myext'
+    extension_dir.mkdir(parents=True)
+    (extension_dir / 'extension.js').write_text('define([], function() {});')
+    return str(tmp_path)
+
+
+@pytest.fixture
+def voila_config(data_dir):
+    os.environ['JUPYTER_PATH'] = data_dir
+    yield lambda app: None
+    del os.environ['JUPYTER_PATH']
+
+
+@pytest.fixture
+def voila_args_extra():
+    return ['--VoilaConfiguration.enable_nbextensions=True']
+
+
+def content_hash(data):
+    return hashlib.sha512(data).hexdigest()
+
+
+async def test_static_url_version(voila_app, base_url, http_server_client):
+    response = await http_server_client.fetch(base_url)
+    html_text = response.body.decode('utf-8')
+    url, = re.findall(r'"([^"]*/static/main\.js[^"]*)"', html_text)
+    path, version = url.split('?v=')
+
+    response = await http_server_client.fetch(url)
+    assert version == content_hash(response.body)
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    response = await http_server_client.fetch(path + '?v=outdated')
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+    response = await http_server_client.fetch(path)
+    assert 'Cache-Control' not in response.headers
+
+
+async def test_nbextension_url_version(voila_app, base_url, http_server_client, data_dir):
+    exporter = VoilaExporter(base_url=base_url, nbextensions_path=voila_app.nbextensions_path)
+    with open(os.path.join(data_dir, 'nbextensions', 'myext', 'extension.js'), 'rb') as f:
+        content = f.read()
+    url = exporter.nbextension_url('myext/extension.js')
+    assert url == base_url + 'voila/nbextensions/myext/extension.js?v=' + content_hash(content)
+
+    response = await http_server_client.fetch(url)
+    assert response.body == content
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    # without a version, the browser should check for modifications
+    response = await http_server_client.fetch(base_url + 'voila/nbextensions/myext/extension.js')
+    assert response.headers['Cache-Control'] == 'no-cache'
+    with pytest.raises(tornado.httpclient.HTTPClientError, match='HTTP 304.*'):
+        await http_server_client.fetch(base_url + 'voila/nbextensions/myext/extension.js', headers={'If-None-Match': response.headers['Etag']})
@@ -0,0 +1,23 @@
+# test that the compiled templates are cached on disk
+import os
+
+import pytest
+
+
+@pytest.fixture
+def bytecode_cache_dir(tmpdir):
+    return os.path.join(str(tmpdir), 'templates')
+
+
+@pytest.fixture
+def voila_args_extra(bytecode_cache_dir):
+    return ['--VoilaConfiguration.template_bytecode_cache_dir=%s' % bytecode_cache_dir]
+
+
+async def test_template_bytecode_cache(http_server_client, base_url, bytecode_cache_dir):
+    response = await http_server_client.fetch(base_url)
+    assert response.code == 200
+    assert 'Hi Voilà' in response.body.decode('utf-8')
+    cache_files = os.listdir(bytecode_cache_dir)
+    assert cache_files
+    assert all(name.startswith('__voila_async_') and name.endswith('.cache') for name in cache_files)
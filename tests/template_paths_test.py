@@ -0,0 +1,26 @@
+import json
+import os
+
+from voila import paths
+
+
+def write_conf(root_dir, template_name, conf):
+    template_dir = os.path.join(root_dir, 'voila', 'templates', template_name)
+    os.makedirs(template_dir, exist_ok=True)
+    with open(os.path.join(template_dir, 'conf.json'), 'w') as f:
+        json.dump(conf, f)
+
+
+def test_template_hierarchy_memoized(tmpdir, monkeypatch):
+    root_dir = str(tmpdir)
+    write_conf(root_dir, 'child', {'base_template': 'parent'})
+    write_conf(root_dir, 'parent', {'base_template': 'base'})
+    assert paths._find_template_hierarchy(['voila'], 'child', [root_dir]) == ['child', 'parent', 'base']
+
+    # within the check interval, the file system is not looked at
+    write_conf(root_dir, 'child', {'base_template': 'base'})
+    os.utime(os.path.join(root_dir, 'voila', 'templates', 'child', 'conf.json'), ns=(0, 0))
+    assert paths._find_template_hierarchy(['voila'], 'child', [root_dir]) == ['child', 'parent', 'base']
+
+    monkeypatch.setattr(paths, 'PATH_CHECK_INTERVAL', 0)
+    assert paths._find_template_hierarchy(['voila'], 'child', [root_dir]) == ['child', 'base']
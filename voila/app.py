@@ -41,7 +41,7 @@ from traitlets import Unicode, Integer, Bool, Dict, List, default
 from jupyter_server.services.kernels.kernelmanager import AsyncMappingKernelManager
 from jupyter_server.services.kernels.handlers import KernelHandler, ZMQChannelsHandler
 from jupyter_server.services.contents.largefilemanager import LargeFileManager
-from jupyter_server.base.handlers import FileFindHandler, path_regex
+from jupyter_server.base.handlers import path_regex
 from jupyter_server.config_manager import recursive_update
 from jupyter_server.utils import url_path_join, run_sync
 from jupyter_server.services.config import ConfigManager
@@ -55,11 +55,29 @@ from ipython_genutils.py3compat import getcwd
 from .paths import ROOT, STATIC_ROOT, collect_template_paths, collect_static_paths
 from .handler import VoilaHandler
 from .treehandler import VoilaTreeHandler
+from .output_handler import OutputHandler
+from .metrics_handler import MetricsHandler
 from ._version import __version__
-from .static_file_handler import MultiStaticFileHandler, TemplateStaticFileHandler, WhiteListFileHandler
+from .static_file_handler import MultiStaticFileHandler, TemplateStaticFileHandler, WhiteListFileHandler, NbextensionsFileHandler
 from .configuration import VoilaConfiguration
 from .execute import VoilaExecutor
 from .exporter import VoilaExporter
+from .kernel_pool import KernelPool
+from .kernel_culler import KernelCuller
+from .render_queue import RenderQueue
+from .notebook_cache import NotebookCache
+from .image_cache import MarkdownImageCache
+from .markdown_cache import MarkdownCache
+from .page_cache import PageCache
+from .snapshots import SnapshotScheduler
+from .snapshot_store import SnapshotStore
+from .output_store import OutputStore
+from .io_executor import IOExecutor
+from .render_pool import RenderPool
+from .kernelspec_registry import KernelSpecRegistry
+from .cache import LRUCache
+from .static_cache import StaticAssetCache
+from .utils import create_template_bytecode_cache
 
 _kernel_id_regex = r"(?P<kernel_id>\w+-\w+-\w+-\w+-\w+)"
 
@@ -130,7 +148,19 @@ class Voila(Application):
     classes = [
         VoilaConfiguration,
         VoilaExecutor,
-        VoilaExporter
+        VoilaExporter,
+        KernelPool,
+        NotebookCache,
+        MarkdownImageCache,
+        MarkdownCache,
+        PageCache,
+        SnapshotScheduler,
+        SnapshotStore,
+        OutputStore,
+        IOExecutor,
+        RenderPool,
+        KernelSpecRegistry,
+        StaticAssetCache
     ]
     connection_dir_root = Unicode(
         config=True,
@@ -422,9 +452,29 @@ class Voila(Application):
                 'shutdown_request'
             ]
         )
+        self.kernel_pool = KernelPool(parent=self, kernel_manager=self.kernel_manager)
+        self.kernel_culler = KernelCuller(
+            parent=self,
+            kernel_manager=self.kernel_manager,
+            voila_configuration=self.voila_configuration
+        )
+        self.render_queue = RenderQueue(parent=self, voila_configuration=self.voila_configuration)
+        self.notebook_cache = NotebookCache(parent=self)
+        self.markdown_image_cache = MarkdownImageCache(parent=self)
+        self.markdown_cache = MarkdownCache(parent=self)
+        self.snapshot_store = SnapshotStore(parent=self)
+        self.page_cache = PageCache(parent=self, store=self.snapshot_store)
+        self.output_store = OutputStore(parent=self, kernel_manager=self.kernel_manager)
+        self.io_executor = IOExecutor(parent=self)
+        self.render_pool = RenderPool(parent=self)
+        self.kernelspec_registry = KernelSpecRegistry(parent=self, kernel_spec_manager=self.kernel_spec_manager,
+                                                      io_executor=self.io_executor)
+        self.static_asset_cache = StaticAssetCache(parent=self)
 
         jenv_opt = {"autoescape": True}  # we might want extra options via cmd line like notebook server
-        env = jinja2.Environment(loader=jinja2.FileSystemLoader(self.template_paths), extensions=['jinja2.ext.i18n'], **jenv_opt)
+        bytecode_cache_dir = self.voila_configuration.template_bytecode_cache_dir
+        env = jinja2.Environment(loader=jinja2.FileSystemLoader(self.template_paths), extensions=['jinja2.ext.i18n'],
+                                 bytecode_cache=create_template_bytecode_cache(bytecode_cache_dir), **jenv_opt)
         nbui = gettext.translation('nbui', localedir=os.path.join(ROOT, 'i18n'), fallback=True)
         env.install_gettext_translations(nbui, newstyle=False)
         self.contents_manager = LargeFileManager(parent=self)
@@ -433,6 +483,15 @@ class Voila(Application):
         read_config_path = [os.path.join(p, 'serverconfig') for p in jupyter_config_path()]
         read_config_path += [os.path.join(p, 'nbconfig') for p in jupyter_config_path()]
         self.config_manager = ConfigManager(parent=self, read_config_path=read_config_path)
+        self.snapshot_scheduler = SnapshotScheduler(
+            parent=self,
+            kernel_manager=self.kernel_manager,
+            contents_manager=self.contents_manager,
+            kernelspec_registry=self.kernelspec_registry,
+            voila_configuration=self.voila_configuration,
+            io_executor=self.io_executor,
+            store=self.snapshot_store
+        )
 
         # default server_url to base_url
         self.server_url = self.server_url or self.base_url
@@ -442,6 +501,22 @@ class Voila(Application):
             server_url=self.server_url or self.base_url,
             kernel_manager=self.kernel_manager,
             kernel_spec_manager=self.kernel_spec_manager,
+            voila_kernel_pool=self.kernel_pool,
+            voila_kernel_culler=self.kernel_culler,
+            voila_render_queue=self.render_queue,
+            voila_notebook_cache=self.notebook_cache,
+            voila_markdown_image_cache=self.markdown_image_cache,
+            voila_markdown_cache=self.markdown_cache,
+            voila_page_cache=self.page_cache,
+            voila_snapshot_scheduler=self.snapshot_scheduler,
+            voila_output_store=self.output_store,
+            voila_io_executor=self.io_executor,
+            voila_render_pool=self.render_pool,
+            voila_kernelspec_registry=self.kernelspec_registry,
+            voila_exporters=LRUCache(max_size=16),
+            voila_template_bytecode_cache=create_template_bytecode_cache(bytecode_cache_dir, enable_async=True),
+            voila_static_asset_cache=self.static_asset_cache,
+            voila_nbextensions_path=self.nbextensions_path,
             allow_remote_access=True,
             autoreload=self.autoreload,
             voila_jinja2_env=env,
@@ -478,13 +553,14 @@ class Voila(Application):
             handlers.append(
                 (
                     url_path_join(self.server_url, r'/voila/nbextensions/(.*)'),
-                    FileFindHandler,
+                    NbextensionsFileHandler,
                     {
                         'path': self.nbextensions_path,
-                        'no_cache_paths': ['/'],  # don't cache anything in nbextensions
                     },
                 )
             )
+        handlers.append((url_path_join(self.server_url, r'/voila/outputs/([0-9a-f]+)'), OutputHandler))
+        handlers.append((url_path_join(self.server_url, r'/voila/metrics'), MetricsHandler))
         handlers.append(
             (
                 url_path_join(self.server_url, r'/voila/files/(.*)'),
@@ -527,9 +603,41 @@ class Voila(Application):
             ])
 
         self.app.add_handlers('.*$', handlers)
+        if self.notebook_path and self.kernel_pool.enabled:
+            # the notebook is known, so the pool can be filled before the first page load
+            tornado.ioloop.IOLoop.current().add_callback(self._prefill_kernel_pool)
+        if self.snapshot_scheduler.enabled:
+            tornado.ioloop.IOLoop.current().add_callback(self.snapshot_scheduler.start)
         self.listen()
 
+    async def _prefill_kernel_pool(self):
+        notebook_path = os.path.relpath(self.notebook_path, self.root_dir)
+        try:
+            model = self.contents_manager.get(path=notebook_path)
+            if model.get('type') != 'notebook':
+                return
+            nb = model['content']
+            kernelspec = nb.metadata.get('kernelspec', {})
+            kernel_name = kernelspec.get('name', self.kernel_manager.default_kernel_name)
+            kernel_specs = await self.kernelspec_registry.get_all_specs()
+            if kernel_name not in kernel_specs:
+                # the same fallback as VoilaHandler.fix_notebook
+                language = kernelspec.get('language', '').lower()
+                kernel_name = self.voila_configuration.language_kernel_mapping.get(language) or \
+                    await self.kernelspec_registry.find_kernel_name(language)
+            if kernel_name not in kernel_specs or not self.kernel_pool.can_pool(kernel_specs[kernel_name]['spec']['language']):
+                return
+            self.kernel_pool.prefill(kernel_name, os.path.dirname(notebook_path), nb, notebook_path)
+        except Exception:
+            self.log.exception('Could not fill the kernel pool for %s', notebook_path)
+
     def stop(self):
+        self.kernel_pool.stop()
+        self.kernel_culler.stop()
+        run_sync(self.snapshot_scheduler.stop())
+        self.io_executor.shutdown()
+        self.render_pool.shutdown()
+        self.static_asset_cache.stop()
         shutil.rmtree(self.connection_dir)
         run_sync(self.kernel_manager.shutdown_all())
 
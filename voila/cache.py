@@ -0,0 +1,92 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import collections
+
+
+class LRUCache(object):
+    """A least recently used cache, bounded by the total size of its entries.
+
+    The size of an entry is given when it is added, in whatever unit the
+    caller uses for `max_size` (usually bytes). Entries larger than `max_size`
+    are not cached, and a `max_size` of 0 disables the cache.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        try:
+            value, size = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key, default=None):
+        """Like get, without counting a hit or a miss, or updating the order of the entries."""
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else default
+
+    def put(self, key, value, size):
+        self.pop(key)
+        if size > self.max_size:
+            return
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size:
+            self._evict()
+
+    def pop(self, key, default=None):
+        try:
+            value, size = self._entries.pop(key)
+        except KeyError:
+            return default
+        self.size -= size
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def keys(self):
+        return list(self._entries)
+
+    def items(self):
+        """The cached (key, value) pairs, without counting hits or updating their order."""
+        return [(key, value) for key, (value, size) in self._entries.items()]
+
+    def _evict(self):
+        key, (value, size) = self._entries.popitem(last=False)
+        self.size -= size
+        self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
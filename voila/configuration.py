@@ -8,7 +8,7 @@
 #############################################################################
 
 import traitlets.config
-from traitlets import Unicode, Bool, Dict, List, Int, Enum
+from traitlets import Unicode, Bool, Dict, List, Int, Float, Enum
 
 
 class VoilaConfiguration(traitlets.config.Configurable):
@@ -81,3 +81,84 @@ class VoilaConfiguration(traitlets.config.Configurable):
     When a cell takes a long time to execute, the http connection can timeout (possibly because of a proxy).
     Voila sends a 'heartbeat' message after the timeout is passed to keep the http connection alive.
     """).tag(config=True)
+
+    flush_min_bytes = Int(64 * 1024, help="""
+    While a page is rendered, the html is sent to the browser once this number of bytes accumulated, or after
+    flush_interval seconds. It is always sent before waiting for the kernel or for the execution of a cell.
+    """).tag(config=True)
+
+    flush_interval = Float(0.05, help="""
+    Maximum time in seconds during which the html of a page being rendered is held back, see flush_min_bytes.
+    """).tag(config=True)
+
+    stream_partial_outputs = Bool(True, help="""
+    Send the outputs of a cell to the browser while it is executed, instead of once it is executed.
+    Only templates that execute the cells one by one (with cell_generator) support it.
+    """).tag(config=True)
+
+    max_partial_outputs = Int(100, help="""
+    Maximum number of outputs of a cell that are sent while it is executed, the others are sent once it is executed.
+    """).tag(config=True)
+
+    compress_pages = Bool(True, help="""
+    Compress the rendered pages for the browsers that accept it, with brotli (if installed) or gzip.
+    The compression is flushed together with the page, so that it is still rendered progressively.
+    """).tag(config=True)
+
+    page_gzip_level = Int(6, help="""
+    Compression level of the pages compressed with gzip (1-9).
+    """).tag(config=True)
+
+    page_brotli_quality = Int(5, help="""
+    Compression quality of the pages compressed with brotli (0-11).
+    """).tag(config=True)
+
+    cull_unconnected_timeout = Int(0, help="""
+    Shut down the kernel of a page when no websocket was connected to it for this number of seconds,
+    after the page was rendered (0 disables this rule).
+    """).tag(config=True)
+
+    cull_max_age = Int(0, help="""
+    Shut down the kernel of a page when it was started this number of seconds ago (0 disables this rule).
+    """).tag(config=True)
+
+    cull_idle_timeout = Int(0, help="""
+    Shut down the kernel of a page when it did not send any message (such as a comm message) for this
+    number of seconds (0 disables this rule).
+    """).tag(config=True)
+
+    cull_interval = Int(60, help="""
+    Interval in seconds at which the kernels of pages are checked against the cull rules.
+    """).tag(config=True)
+
+    max_concurrent_renders = Int(0, help="""
+    Maximum number of notebooks that are rendered at the same time, further requests are queued (0 means unlimited).
+    """).tag(config=True)
+
+    max_concurrent_renders_per_notebook = Int(0, help="""
+    Maximum number of renders of the same notebook at the same time, further requests are queued (0 means unlimited).
+    """).tag(config=True)
+
+    render_queue_size = Int(100, help="""
+    Maximum number of requests waiting for a render, further requests get a 503 response.
+    """).tag(config=True)
+
+    render_queue_retry_after = Int(10, help="""
+    Value in seconds of the Retry-After header sent when the render queue is full.
+    """).tag(config=True)
+
+    page_cache_ttl = Int(0, help="""
+    Cache the html of the rendered pages for this number of seconds, keyed by the notebook and the query string,
+    and serve them without starting a kernel (0 disables this cache). Only suited to notebooks whose output only
+    depends on the notebook and the query string, and which do not need a kernel once rendered. A notebook can
+    also set this in its metadata, as voila.page_cache_ttl.
+    """).tag(config=True)
+
+    inline_markdown_images = Bool(True, help="""
+    Inline the images of the markdown cells in the page. When False, they are referred to by a /voila/files/ url
+    containing the hash of the image, which browsers cache (the files need to match file_whitelist).
+    """).tag(config=True)
+
+    template_bytecode_cache_dir = Unicode('', help="""
+    Directory where the compiled templates are cached, so that a new process does not need to compile them again (empty to disable).
+    """).tag(config=True)
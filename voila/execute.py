@@ -7,11 +7,22 @@
 # The full license is in the file LICENSE, distributed with this software.  #
 #############################################################################
 
+import html
+import json
+import re
+import time
+
+import nbformat
 from nbconvert.preprocessors import ClearOutputPreprocessor
 from nbclient.exceptions import CellExecutionError
 from nbclient import NotebookClient
 
-from traitlets import Unicode
+from traitlets import Any, Bool, Int, Unicode
+
+from .partial_outputs import OUTPUT_MSG_TYPES
+
+# the text of a line that is overwritten after a carriage return, as in nbconvert's coalesce_streams
+CARRIAGE_RETURN_PATTERN = re.compile(r'.*\r(?=[^\n])')
 
 
 def strip_code_cell_warnings(cell):
@@ -29,6 +40,15 @@ def strip_code_cell_warnings(cell):
     return cell
 
 
+def output_size(content):
+    """The approximate size of an output, from the content of its message."""
+    if 'text' in content:
+        return len(content['text'])
+    if 'data' in content:
+        return sum(len(value) if isinstance(value, str) else len(json.dumps(value)) for value in content['data'].values())
+    return sum(len(line) for line in content.get('traceback', []))
+
+
 class VoilaExecutor(NotebookClient):
     """Execute, but respect the output widget behaviour"""
     cell_error_instruction = Unicode(
@@ -47,6 +67,146 @@ class VoilaExecutor(NotebookClient):
         )
     )
 
+    coalesce_streams = Bool(
+        True,
+        config=True,
+        help=(
+            'merge the consecutive stream outputs of a cell (e.g. printing in a loop) into a single output, '
+            'and drop the lines that are overwritten after a carriage return'
+        )
+    )
+
+    max_cell_output_size = Int(
+        10 * 1024 * 1024,
+        config=True,
+        help=(
+            'maximum size in bytes of the outputs of a cell, the outputs beyond it are dropped (0 for no limit)'
+        )
+    )
+
+    max_notebook_output_size = Int(
+        50 * 1024 * 1024,
+        config=True,
+        help=(
+            'maximum size in bytes of the outputs of all the cells of a notebook, the outputs beyond it are dropped (0 for no limit)'
+        )
+    )
+
+    output_truncated_instruction = Unicode(
+        'Please run Voilà with a larger --VoilaExecutor.max_cell_output_size or --VoilaExecutor.max_notebook_output_size to see all of it.',
+        config=True,
+        help=(
+            'instruction given to user when the outputs are truncated'
+        )
+    )
+
+    # called with the cell and the message, after an iopub message changed the outputs of a cell
+    on_cell_output = Any(allow_none=True)
+    # called with the cell and the duration of its execution, after a code cell is executed
+    on_cell_executed = Any(allow_none=True)
+
+    def reset_execution_trackers(self):
+        super(VoilaExecutor, self).reset_execution_trackers()
+        # the size of the outputs of each cell, and of all of them
+        self.output_sizes = {}
+        self.notebook_output_size = 0
+        # the indices of the cells whose outputs were truncated
+        self.truncated_cells = set()
+
+    async def async_execute_cell(self, cell, cell_index, *args, **kwargs):
+        started = time.monotonic()
+        try:
+            return await super(VoilaExecutor, self).async_execute_cell(cell, cell_index, *args, **kwargs)
+        finally:
+            # empty cells are not sent to the kernel
+            if self.on_cell_executed is not None and cell.cell_type == 'code' and cell.source.strip():
+                self.on_cell_executed(cell, time.monotonic() - started)
+
+    def process_message(self, msg, cell, cell_index):
+        output = super(VoilaExecutor, self).process_message(msg, cell, cell_index)
+        if self.on_cell_output is not None and msg['msg_type'] in OUTPUT_MSG_TYPES:
+            self.on_cell_output(cell, msg)
+        return output
+
+    def output(self, outs, msg, display_id, cell_index):
+        parent_msg_id = msg['parent_header'].get('msg_id')
+        if self.output_hook_stack[parent_msg_id]:
+            # the outputs captured by an output widget are kept in its state
+            return super(VoilaExecutor, self).output(outs, msg, display_id, cell_index)
+
+        if self.clear_before_next_output:
+            # only the outputs after the last clear_output(wait=True) are kept, so they are all that count
+            self.clear_before_next_output = False
+            outs[:] = []
+            self.clear_display_id_mapping(cell_index)
+            self._reset_output_size(cell_index)
+        if cell_index in self.truncated_cells:
+            return None
+
+        content = msg['content']
+        remaining = self._remaining_output_size(cell_index)
+        if msg['msg_type'] == 'stream' and self.coalesce_streams and outs and \
+                outs[-1].get('output_type') == 'stream' and outs[-1].get('name') == content.get('name'):
+            last = outs[-1]
+            # a carriage return only overwrites its own line, so the complete lines are left as they are
+            head, newline, tail = last.text.rpartition('\n')
+            head += newline
+            text = tail + content.get('text', '')
+            if '\r' in text:
+                text = CARRIAGE_RETURN_PATTERN.sub('', text)
+            if remaining is not None and len(text) - len(tail) > remaining:
+                text = text[:len(tail) + remaining]
+                self._truncate(outs, cell_index)
+            self._add_output_size(cell_index, len(text) - len(tail))
+            last.text = head + text
+            return last
+
+        size = output_size(content)
+        if remaining is None or size <= remaining:
+            output = super(VoilaExecutor, self).output(outs, msg, display_id, cell_index)
+            self._add_output_size(cell_index, size)
+            return output
+        output = None
+        if msg['msg_type'] == 'stream' and remaining > 0:
+            # keep the beginning of the text
+            msg = dict(msg, content=dict(content, text=content.get('text', '')[:remaining]))
+            output = super(VoilaExecutor, self).output(outs, msg, display_id, cell_index)
+            self._add_output_size(cell_index, remaining)
+        self._truncate(outs, cell_index)
+        return output
+
+    def clear_output(self, outs, msg, cell_index):
+        parent_msg_id = msg['parent_header'].get('msg_id')
+        super(VoilaExecutor, self).clear_output(outs, msg, cell_index)
+        if not self.output_hook_stack[parent_msg_id] and not msg['content'].get('wait'):
+            self._reset_output_size(cell_index)
+
+    def _remaining_output_size(self, cell_index):
+        """The number of bytes the outputs of a cell can still take, or None if there is no limit."""
+        remaining = []
+        if self.max_cell_output_size > 0:
+            remaining.append(self.max_cell_output_size - self.output_sizes.get(cell_index, 0))
+        if self.max_notebook_output_size > 0:
+            remaining.append(self.max_notebook_output_size - self.notebook_output_size)
+        return max(min(remaining), 0) if remaining else None
+
+    def _add_output_size(self, cell_index, size):
+        self.output_sizes[cell_index] = self.output_sizes.get(cell_index, 0) + size
+        self.notebook_output_size += size
+
+    def _reset_output_size(self, cell_index):
+        self.notebook_output_size -= self.output_sizes.pop(cell_index, 0)
+        self.truncated_cells.discard(cell_index)
+
+    def _truncate(self, outs, cell_index):
+        """Drop the next outputs of a cell, until they are cleared, and tell the user."""
+        self.truncated_cells.add(cell_index)
+        message = 'The outputs of this cell were truncated, because they exceed the size limit. {}'.format(self.output_truncated_instruction)
+        outs.append(nbformat.v4.new_output('display_data', data={
+            'text/plain': message,
+            'text/html': '<div class="voila-output-truncated">{}</div>'.format(html.escape(message)),
+        }))
+
     def execute(self, nb, resources, km=None):
         try:
             result = super(VoilaExecutor, self).execute()
@@ -61,6 +221,8 @@ class VoilaExecutor(NotebookClient):
         return result
 
     async def execute_cell(self, cell, resources, cell_index, store_history=True):
+        # the outputs of a cell are cleared before it is executed
+        self._reset_output_size(cell_index)
         try:
             result = await self.async_execute_cell(cell, cell_index, store_history)
         except TimeoutError as e:
@@ -7,35 +7,82 @@
 # The full license is in the file LICENSE, distributed with this software.  #
 #############################################################################
 
+import asyncio
 import mimetypes
+import os
+import re
+import secrets
+import urllib.parse
 
 import traitlets
 from traitlets.config import Config
 
 from jinja2 import contextfilter
 import jinja2
+from mistune import escape_link
 
 from nbconvert.filters.markdown_mistune import IPythonRenderer, MarkdownWithMath
 from nbconvert.exporters.html import HTMLExporter
-from nbconvert.exporters.templateexporter import TemplateExporter
 from nbconvert.filters.highlight import Highlight2HTML
 
-from .static_file_handler import TemplateStaticFileHandler
+from .static_file_handler import NbextensionsFileHandler, TemplateStaticFileHandler
+
+
+def image_src(src, contents_manager, image_cache=None, image_url_prefix=None, images=None):
+    """The src of an image of a markdown cell, inlined or versioned when it is a file of the contents manager."""
+    if image_cache is not None:
+        image = image_cache.get(contents_manager, src, inline=image_url_prefix is None)
+        if images is not None and not src.startswith('attachment:') and not urllib.parse.urlparse(src).scheme:
+            # the images the html depends on, see MarkdownCache
+            images.append((src, image.hash if image is not None else None))
+        if image is not None:
+            if image_url_prefix is None:
+                src = image.data_uri
+            else:
+                # a versioned url, which the browser can cache
+                src = '{prefix}{path}?v={version}'.format(prefix=image_url_prefix, path=urllib.parse.quote(image.path), version=image.hash)
+    elif contents_manager.file_exists(src):
+        content = contents_manager.get(src, format='base64')
+        data = content['content'].replace('\n', '')  # remove the newline
+        mime_type, encoding = mimetypes.guess_type(src)
+        src = 'data:{mime_type};base64,{data}'.format(mime_type=mime_type, data=data)
+    return src
 
 
 class VoilaMarkdownRenderer(IPythonRenderer):
     """Custom markdown renderer that inlines images"""
 
     def image(self, src, title, text):
-        contents_manager = self.options['contents_manager']
-        if contents_manager.file_exists(src):
-            content = contents_manager.get(src, format='base64')
-            data = content['content'].replace('\n', '')  # remove the newline
-            mime_type, encoding = mimetypes.guess_type(src)
-            src = 'data:{mime_type};base64,{data}'.format(mime_type=mime_type, data=data)
+        deferred_images = self.options.get('deferred_images')
+        if deferred_images is not None:
+            # rendered in a worker process of the RenderPool, without the contents manager: the src
+            # is replaced by a placeholder, which the exporter replaces by the inlined image
+            if not src.startswith('attachment:'):
+                deferred_images.append(src)
+                src = '{}-{}'.format(self.options['image_placeholder'], len(deferred_images) - 1)
+            return super(VoilaMarkdownRenderer, self).image(src, title, text)
+        src = image_src(src, self.options['contents_manager'], self.options.get('image_cache'),
+                        self.options.get('image_url_prefix'), self.options.get('images'))
         return super(VoilaMarkdownRenderer, self).image(src, title, text)
 
 
+def render_markdown(renderer_class, source, attachments, anchor_link_text, image_placeholder):
+    """Renders a markdown cell in a worker process of the RenderPool, returns its html and the src of its images."""
+    images = []
+    renderer = renderer_class(escape=False, attachments=attachments,
+                              anchor_link_text=anchor_link_text,
+                              deferred_images=images,
+                              image_placeholder=image_placeholder)
+    return MarkdownWithMath(renderer=renderer).render(source), images
+
+
+def highlight(pygments_lexer, extra_formatter_options, source, language, metadata):
+    """Highlights the input of a code cell in a worker process of the RenderPool."""
+    # extra_formatter_options is only set when the installed nbconvert has it
+    options = {'extra_formatter_options': extra_formatter_options} if extra_formatter_options else {}
+    return Highlight2HTML(pygments_lexer=pygments_lexer, **options)(source, language=language, metadata=metadata)
+
+
 class VoilaExporter(HTMLExporter):
     """Custom HTMLExporter that inlines the images using VoilaMarkdownRenderer"""
 
@@ -43,19 +90,118 @@ class VoilaExporter(HTMLExporter):
     markdown_renderer_class = traitlets.Type('mistune.Renderer').tag(config=True)
     # Can be a ContentsManager from notebook or jupyter_server, so Any will have to do for now
     contents_manager = traitlets.Any()
+    # a jinja2.BytecodeCache, persisting the compiled templates
+    bytecode_cache = traitlets.Any(allow_none=True)
+    nbextensions_path = traitlets.List(help="Paths to look for the notebook extensions, for their urls")
+    # a MarkdownImageCache, for the images of the markdown cells
+    image_cache = traitlets.Any(allow_none=True)
+    # a MarkdownCache, for the html of the markdown cells
+    markdown_cache = traitlets.Any(allow_none=True)
+    # an IOExecutor, the markdown cells are rendered in its threads since the images they refer to are read
+    io_executor = traitlets.Any(allow_none=True)
+    # a RenderPool, rendering the markdown cells and the inputs of the code cells in worker processes
+    render_pool = traitlets.Any(allow_none=True)
+    inline_images = traitlets.Bool(True, help="Inline the images of the markdown cells, or refer to them by url")
+
+    def __init__(self, **kwargs):
+        # maps pygments lexer names to highlight filters
+        self._highlighters = {}
+        super(VoilaExporter, self).__init__(**kwargs)
 
     # The voila exporter overrides the markdown renderer from the HTMLExporter
     # to inline images.
 
     @contextfilter
-    def markdown2html(self, context, source):
-        cell = context['cell']
-        attachments = cell.get('attachments', {})
+    async def markdown2html(self, context, source):
+        attachments = context['cell'].get('attachments', {})
+        fragment = self._fragment(context, ('markdown', source))
+        if fragment is not None and fragment[0] == attachments:
+            return await fragment[1]
+        return await self._render_markdown(source, attachments)
+
+    async def _render_markdown(self, source, attachments):
         cls = self.markdown_renderer_class
+        if not self._render_in_pool() or not issubclass(cls, VoilaMarkdownRenderer):
+            return await self._run_io('markdown', self._markdown2html, source, attachments)
+        image_url_prefix = self._image_url_prefix()
+        key = None
+        if self._markdown_cache_enabled():
+            key = self.markdown_cache.key(source, attachments, cls, image_url_prefix=image_url_prefix, anchor_link_text=self.anchor_link_text)
+            html = await self._run_io('markdown', self._cached_markdown, key, image_url_prefix is None)
+            if html is not None:
+                return html
+        image_placeholder = 'voila-image-' + secrets.token_hex(8)
+        html, srcs = await self.render_pool.run('markdown', render_markdown, cls, source, attachments, self.anchor_link_text, image_placeholder)
+        images = []
+        if srcs:
+            srcs = await self._run_io('markdown', self._image_srcs, srcs, image_url_prefix, images)
+            html = re.sub(re.escape(image_placeholder) + r'-(\d+)', lambda match: escape_link(srcs[int(match.group(1))]), html)
+        if key is not None:
+            self.markdown_cache.put(key, html, images)
+        return html
+
+    def _markdown2html(self, source, attachments):
+        cls = self.markdown_renderer_class
+        image_url_prefix = self._image_url_prefix()
+        if not self._markdown_cache_enabled():
+            renderer = cls(escape=False, attachments=attachments,
+                           contents_manager=self.contents_manager,
+                           image_cache=self.image_cache,
+                           image_url_prefix=image_url_prefix,
+                           anchor_link_text=self.anchor_link_text)
+            return MarkdownWithMath(renderer=renderer).render(source)
+
+        key = self.markdown_cache.key(source, attachments, cls, image_url_prefix=image_url_prefix, anchor_link_text=self.anchor_link_text)
+        html = self._cached_markdown(key, image_url_prefix is None)
+        if html is not None:
+            return html
+        images = []
         renderer = cls(escape=False, attachments=attachments,
                        contents_manager=self.contents_manager,
-                       anchor_link_text=self.anchor_link_text)
-        return MarkdownWithMath(renderer=renderer).render(source)
+                       image_cache=self.image_cache,
+                       image_url_prefix=image_url_prefix,
+                       anchor_link_text=self.anchor_link_text,
+                       images=images)
+        html = MarkdownWithMath(renderer=renderer).render(source)
+        self.markdown_cache.put(key, html, images)
+        return html
+
+    def _image_url_prefix(self):
+        return None if self.inline_images else f'{self.base_url}voila/files/'
+
+    def _markdown_cache_enabled(self):
+        # without the image cache, the images the html depends on cannot be checked
+        return self.markdown_cache is not None and self.markdown_cache.enabled and self.image_cache is not None
+
+    def _cached_markdown(self, key, inline):
+        rendered = self.markdown_cache.get(key)
+        if rendered is not None and self._images_unchanged(rendered.images, inline):
+            return rendered.html
+        return None
+
+    def _images_unchanged(self, images, inline):
+        for src, version in images:
+            image = self.image_cache.get(self.contents_manager, src, inline=inline)
+            if (image.hash if image is not None else None) != version:
+                return False
+        return True
+
+    def _image_srcs(self, srcs, image_url_prefix, images):
+        images_list = images if self._markdown_cache_enabled() else None
+        return [image_src(src, self.contents_manager, self.image_cache, image_url_prefix, images_list) for src in srcs]
+
+    async def _run_io(self, name, func, *args):
+        if self.io_executor is None:
+            return func(*args)
+        return await self.io_executor.run(name, func, *args)
+
+    def _render_in_pool(self):
+        return self.render_pool is not None and self.render_pool.enabled
+
+    def _fragment(self, context, key):
+        """A fragment rendered ahead of the template by the RenderPool, see _render_fragments."""
+        resources = context.get('resources') or {}
+        return (resources.get('voila_fragments') or {}).get(key)
 
     # The voila exporter disables the CSSHTMLHeaderPreprocessor from the HTMLExporter.
 
@@ -75,15 +221,53 @@ class VoilaExporter(HTMLExporter):
     def default_template_file(self):
         return 'index.html.j2'
 
+    # The exporter is shared by requests, so the lexer of the notebook is looked up
+    # in the template context instead of registering a filter for each notebook.
+
+    @contextfilter
+    async def highlight_code(self, context, source, language=None, metadata=None):
+        fragment = self._fragment(context, ('code', source, language, self._magics_language(metadata)))
+        if fragment is not None:
+            return await fragment[1]
+        return await self._highlight_code(self._highlighter(context.get('nb')), source, language, metadata)
+
+    async def _highlight_code(self, highlighter, source, language=None, metadata=None):
+        if not self._render_in_pool():
+            return highlighter(source, language=language, metadata=metadata)
+        # the only metadata used to highlight a cell, the rest of it is not sent to the worker process
+        magics_language = self._magics_language(metadata)
+        metadata = {'magics_language': magics_language} if magics_language is not None else None
+        return await self.render_pool.run('highlight', highlight, highlighter.pygments_lexer,
+                                          getattr(highlighter, 'extra_formatter_options', {}), source, language, metadata)
+
+    def _highlighter(self, nb):
+        langinfo = nb.metadata.get('language_info', {}) if nb is not None else {}
+        lexer = langinfo.get('pygments_lexer', langinfo.get('name', None))
+        if lexer not in self._highlighters:
+            self._highlighters[lexer] = Highlight2HTML(pygments_lexer=lexer, parent=self)
+        return self._highlighters[lexer]
+
+    def _magics_language(self, metadata):
+        return metadata.get('magics_language') if metadata else None
+
+    def default_filters(self):
+        yield from super(VoilaExporter, self).default_filters()
+        yield ('highlight_code', self.highlight_code)
+
     async def generate_from_notebook_node(self, nb, resources=None, extra_context={}, **kw):
         # this replaces from_notebook_node, but calls template.generate instead of template.render
-        langinfo = nb.metadata.get('language_info', {})
-        lexer = langinfo.get('pygments_lexer', langinfo.get('name', None))
-        highlight_code = self.filters.get('highlight_code', Highlight2HTML(pygments_lexer=lexer, parent=self))
-        self.register_filter('highlight_code', highlight_code)
 
         # NOTE: we don't call HTML or TemplateExporter' from_notebook_node
-        nb_copy, resources = super(TemplateExporter, self).from_notebook_node(nb, resources, **kw)
+        # Exporter.from_notebook_node deep copies the notebook, and _preprocess copies it again. The notebook is
+        # already a copy made for this request, but its outputs are shared with the NotebookCache and some
+        # preprocessors (such as coalesce_streams) modify outputs in place, so we only skip the first copy.
+        resources = self._init_resources(resources)
+        if 'language' in nb['metadata']:
+            resources['language'] = nb['metadata']['language'].lower()
+        nb_copy, resources = self._preprocess(nb, resources)
+        if hasattr(self, '_nb_metadata'):  # used by the HTMLExporter in recent versions of nbconvert
+            metadata = resources.get('metadata', {})
+            self._nb_metadata[os.path.join(metadata.get('path', ''), metadata.get('name', ''))] = nb_copy.metadata
         resources.setdefault('raw_mimetypes', self.raw_mimetypes)
         resources['global_content_filter'] = {
                 'include_code': not self.exclude_code_cell,
@@ -97,8 +281,46 @@ class VoilaExporter(HTMLExporter):
                 'no_prompt': self.exclude_input_prompt and self.exclude_output_prompt,
                 }
 
-        async for output in self.template.generate_async(nb=nb_copy, resources=resources, **extra_context, static_url=self.static_url):
-            yield (output, resources)
+        fragments = None
+        if self._render_in_pool():
+            fragments = resources['voila_fragments'] = self._render_fragments(nb_copy, resources['global_content_filter'])
+        try:
+            async for output in self.template.generate_async(nb=nb_copy, resources=resources, **extra_context, static_url=self.static_url,
+                                                             nbextension_url=self.nbextension_url):
+                yield (output, resources)
+        finally:
+            if fragments:
+                self._discard_fragments(fragments)
+
+    def _render_fragments(self, nb, content_filter):
+        """Start rendering the markdown cells and the inputs of the code cells in the RenderPool.
+
+        The fragments are rendered while the template renders the cells before them, or waits for
+        the kernel, and are looked up by the filters, keyed by source (cells with the same source
+        share their fragment).
+        """
+        highlighter = self._highlighter(nb)
+        highlight_inputs = content_filter['include_code'] and content_filter['include_input']
+        fragments = {}
+        for cell in nb.cells:
+            if cell.cell_type == 'markdown' and content_filter['include_markdown']:
+                key = ('markdown', cell.source)
+                attachments = cell.get('attachments', {})
+                if key not in fragments:
+                    fragments[key] = (attachments, asyncio.ensure_future(self._render_markdown(cell.source, attachments)))
+            elif cell.cell_type == 'code' and highlight_inputs:
+                key = ('code', cell.source, None, self._magics_language(cell.metadata))
+                if key not in fragments:
+                    fragments[key] = (None, asyncio.ensure_future(self._highlight_code(highlighter, cell.source, None, cell.metadata)))
+        return fragments
+
+    def _discard_fragments(self, fragments):
+        for attachments, future in fragments.values():
+            if not future.done():
+                future.cancel()
+            elif not future.cancelled():
+                # the fragments that were not rendered by the template, their errors are not reported
+                future.exception()
 
     @property
     def environment(self):
@@ -107,6 +329,8 @@ class VoilaExporter(HTMLExporter):
         env = super(type(self), self).environment
         if 'jinja2.ext.do' not in env.extensions:
             env.add_extension('jinja2.ext.do')
+        if self.bytecode_cache is not None:
+            env.bytecode_cache = self.bytecode_cache
         return env
 
     def get_template_paths(self):
@@ -120,6 +344,14 @@ class VoilaExporter(HTMLExporter):
         }
         return TemplateStaticFileHandler.make_static_url(settings, f'{self.template_name}/static/{path}')
 
+    def nbextension_url(self, path):
+        """Like static_url, for a file of the notebook extensions"""
+        settings = {
+            'static_url_prefix': f'{self.base_url}voila/nbextensions/',
+            'static_path': self.nbextensions_path
+        }
+        return NbextensionsFileHandler.make_static_url(settings, path)
+
     def _init_resources(self, resources):
         def make_url(path):
             # similar to static_url, but does not assume the static prefix
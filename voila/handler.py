@@ -8,11 +8,15 @@
 #############################################################################
 
 import asyncio
+import datetime
+import functools
 import os
 import sys
+import time
 import traceback
 
 import tornado.web
+from jinja2 import contextfunction
 
 from jupyter_server.base.handlers import JupyterHandler
 from jupyter_server.config_manager import recursive_update
@@ -22,12 +26,20 @@ import nbformat
 from nbconvert.preprocessors import ClearOutputPreprocessor
 from nbclient.exceptions import CellExecutionError
 from nbclient.util import ensure_async
-from tornado.httputil import split_host_and_port
+from tornado.httputil import split_host_and_port, url_concat
 
 from ._version import __version__
+from .compression import StreamCompressor, accepted_encodings, brotli
 from .execute import VoilaExecutor, strip_code_cell_warnings
+from .io_executor import IOExecutor
 from .exporter import VoilaExporter
+from .kernelspec_registry import language_kernel_names
+from .metrics import (CELL_EXECUTION, KERNEL_START, KERNEL_WAIT_FOR_READY, RENDER, RENDERS_IN_PROGRESS, STREAMED_BYTES, TIME_TO_FIRST_BYTE,
+                      notebook_label)
+from .notebook_cache import copy_notebook
+from .partial_outputs import PartialOutputs
 from .paths import collect_template_paths
+from .render_queue import RenderQueueFull
 
 
 class VoilaHandler(JupyterHandler):
@@ -37,8 +49,37 @@ class VoilaHandler(JupyterHandler):
         self.template_paths = kwargs.pop('template_paths', [])
         self.traitlet_config = kwargs.pop('config', None)
         self.voila_configuration = kwargs['voila_configuration']
+        self.kernel_pool = self.settings.get('voila_kernel_pool')
+        self.kernel_culler = self.settings.get('voila_kernel_culler')
+        self.render_queue = self.settings.get('voila_render_queue')
+        self.render_ticket = None
+        self.notebook_cache = self.settings.get('voila_notebook_cache')
+        self.page_cache = self.settings.get('voila_page_cache')
+        self.snapshot_scheduler = self.settings.get('voila_snapshot_scheduler')
+        # the key of the page this request renders for the page cache, and its time to live
+        self.page_key = None
+        self.page_ttl = 0
+        # the notebook and template the durations of the render are labelled with, see voila.metrics
+        self.metrics_labels = None
+        self.rendering = False
+        self.first_byte_sent = False
+        self.kernelspec_registry = self.settings.get('voila_kernelspec_registry')
         # we want to avoid starting multiple kernels due to template mistakes
         self.kernel_started = False
+        # cells that were already executed in a kernel from the pool
+        self.warm_cells = []
+        # the number of bytes written since the last flush, and its time
+        self.unflushed_size = 0
+        self.last_flush = time.monotonic()
+        # compresses the page, if the browser accepts it
+        self.page_compressor = None
+        # send the outputs of the cells while they are executed
+        self.stream_partial_outputs = self.voila_configuration.stream_partial_outputs
+        # large outputs are served by url
+        self.output_store = self.settings.get('voila_output_store')
+        # blocking file system calls are made in a thread pool
+        self.io_executor = self.settings.get('voila_io_executor') or IOExecutor(max_workers=0)
+        self.store_outputs = self.output_store is not None and self.output_store.enabled
 
     @tornado.web.authenticated
     async def get(self, path=None):
@@ -47,11 +88,48 @@ class VoilaHandler(JupyterHandler):
         if self.notebook_path and path:  # when we are in single notebook mode but have a path
             self.redirect_to_file(path)
             return
+        self.rendering = True
+        RENDERS_IN_PROGRESS.inc()
+
+        snapshot = None
+        if self.snapshot_scheduler is not None and self.get_argument('voila-live', None) is None:
+            # the pages of scheduled notebooks are rendered from their latest snapshot, without a kernel
+            snapshot = self.snapshot_scheduler.get(notebook_path)
+
+        # only the notebooks that can opt in go through the page cache
+        use_page_cache = snapshot is None and self.page_cache is not None and self.page_cache.enabled
+        if use_page_cache and (self.voila_configuration.page_cache_ttl > 0 or self.page_cache.opted_in(notebook_path)):
+            # getting the model without its content only needs a stat of the file
+            model = await self.io_executor.run('contents.stat', self.contents_manager.get, path=notebook_path, content=False)
+            self.metrics_labels = (notebook_label(notebook_path),)
+            page_key = self.page_cache.key(model, self.request.query)
+            # a page that is being rendered by another request is waited for, instead of being rendered again
+            html = self.page_cache.get(page_key) or await self.page_cache.wait(page_key)
+            # whether the notebook opted in is only known once it is loaded, until then other requests wait
+            if html is None and self.page_cache.rendering(page_key):
+                self.page_key = page_key
+                # the page may have been rendered before a restart, or by another process
+                html = await self.page_cache.load(page_key)
+            if html is not None:
+                self._release_page()
+                self.set_page_headers()
+                self.write_snippet(html)
+                self.finish_snippets()
+                return
+
+        if self.render_queue is not None and snapshot is None:
+            try:
+                self.render_ticket = self.render_queue.enter(notebook_path)
+            except RenderQueueFull:
+                self.set_status(503)
+                self.set_header('Retry-After', str(self.voila_configuration.render_queue_retry_after))
+                self.finish('Too many requests, please try again later.')
+                return
 
         if self.voila_configuration.enable_nbextensions:
             # generate a list of nbextensions that are enabled for the classical notebook
             # a template can use that to load classical notebook extensions, but does not have to
-            notebook_config = self.config_manager.get('notebook')
+            notebook_config = await self.io_executor.run('config.get', self.config_manager.get, 'notebook')
             # except for the widget extension itself, since Voilà has its own
             load_extensions = notebook_config.get('load_extensions', {})
             if 'jupyter-js-widgets/extension' in load_extensions:
@@ -62,24 +140,41 @@ class VoilaHandler(JupyterHandler):
         else:
             nbextensions = []
 
-        notebook = await self.load_notebook(notebook_path)
-        if not notebook:
-            return
+        if snapshot is not None:
+            notebook = copy_notebook(snapshot.notebook)
+        else:
+            notebook = await self.load_notebook(notebook_path)
+            if not notebook:
+                return
+            if use_page_cache:
+                opted_in = self.get_page_cache_ttl(notebook) > 0
+                self.page_cache.set_opted_in(notebook_path, opted_in)
+                if opted_in and self.page_key is None:
+                    # the first request since the notebook opted in from its metadata caches its page too
+                    model = await self.io_executor.run('contents.stat', self.contents_manager.get, path=notebook_path, content=False)
+                    page_key = self.page_cache.key(model, self.request.query)
+                    if self.page_cache.rendering(page_key):
+                        self.page_key = page_key
+        # only the notebooks that exist are labelled, the requests for other paths do not add series
+        self.metrics_labels = (notebook_label(notebook_path),)
+        self.render_path = notebook_path
         self.cwd = os.path.dirname(notebook_path)
 
         path, basename = os.path.split(notebook_path)
         notebook_name = os.path.splitext(basename)[0]
 
         # Adding request uri to kernel env
-        self.kernel_env = os.environ.copy()
-        self.kernel_env['SCRIPT_NAME'] = self.request.path
-        self.kernel_env['PATH_INFO'] = ''  # would be /foo/bar if voila.ipynb/foo/bar was supported
-        self.kernel_env['QUERY_STRING'] = str(self.request.query)
-        self.kernel_env['SERVER_SOFTWARE'] = 'voila/{}'.format(__version__)
-        self.kernel_env['SERVER_PROTOCOL'] = str(self.request.version)
+        self.request_env = {}
+        self.request_env['SCRIPT_NAME'] = self.request.path
+        self.request_env['PATH_INFO'] = ''  # would be /foo/bar if voila.ipynb/foo/bar was supported
+        self.request_env['QUERY_STRING'] = str(self.request.query)
+        self.request_env['SERVER_SOFTWARE'] = 'voila/{}'.format(__version__)
+        self.request_env['SERVER_PROTOCOL'] = str(self.request.version)
         host, port = split_host_and_port(self.request.host.lower())
-        self.kernel_env['SERVER_PORT'] = str(port) if port else ''
-        self.kernel_env['SERVER_NAME'] = host
+        self.request_env['SERVER_PORT'] = str(port) if port else ''
+        self.request_env['SERVER_NAME'] = host
+        self.kernel_env = os.environ.copy()
+        self.kernel_env.update(self.request_env)
 
         # we can override the template via notebook metadata or a query parameter
         template_override = None
@@ -108,6 +203,13 @@ class VoilaHandler(JupyterHandler):
             }
         }
 
+        if snapshot is not None:
+            resources['snapshot'] = {
+                'refreshed': datetime.datetime.fromtimestamp(snapshot.refreshed).isoformat(sep=' ', timespec='seconds'),
+                'duration': snapshot.duration,
+                'live_url': url_concat(self.request.uri, {'voila-live': '1'}),
+            }
+
         # include potential extra resources
         extra_resources = self.voila_configuration.config.VoilaConfiguration.resources
         # if no resources get configured from neither the CLI nor a config file,
@@ -122,91 +224,310 @@ class VoilaHandler(JupyterHandler):
         if extra_resources:
             recursive_update(resources, extra_resources)
 
-        self.exporter = VoilaExporter(
-            template_paths=self.template_paths,
-            template_name=template_name,
-            config=self.traitlet_config,
-            contents_manager=self.contents_manager,  # for the image inlining
-            theme=theme,  # we now have the theme in two places
-            base_url=self.base_url,
-        )
-        if self.voila_configuration.strip_sources:
-            self.exporter.exclude_input = True
-            self.exporter.exclude_output_prompt = True
-            self.exporter.exclude_input_prompt = True
+        self.exporter = self.get_exporter(template_name, theme)
 
         # These functions allow the start of a kernel and execution of the notebook after (parts of) the template
         # has been rendered and send to the client to allow progressive rendering.
         # Template should first call kernel_start, and then decide to use notebook_execute
         # or cell_generator to implement progressive cell rendering
-        extra_context = {
-            'kernel_start': self._jinja_kernel_start,
-            'cell_generator': self._jinja_cell_generator,
-            'notebook_execute': self._jinja_notebook_execute,
-        }
+        if snapshot is not None:
+            extra_context = {
+                'kernel_start': self._jinja_snapshot_kernel_start,
+                'cell_generator': self._jinja_snapshot_cell_generator,
+                'notebook_execute': self._jinja_snapshot_notebook_execute,
+            }
+        else:
+            extra_context = {
+                'kernel_start': self._jinja_kernel_start,
+                'cell_generator': self._jinja_cell_generator,
+                'notebook_execute': self._jinja_notebook_execute,
+            }
+        # templates can send what was rendered so far to the browser
+        extra_context['flush'] = self._jinja_flush
+
+        page_ttl = self.page_ttl = self.get_page_cache_ttl(notebook) if self.page_key is not None else 0
+        if page_ttl <= 0:
+            self._release_page()
+        # the snippets of a page that will be cached
+        page = [] if page_ttl > 0 else None
+        # a cached page is the same for every request, the outputs are only sent once the cells are executed
+        self.stream_partial_outputs = self.stream_partial_outputs and page is None
+        # and it outlives the output store (it can be kept on disk), so its outputs are inlined
+        self.store_outputs = self.store_outputs and page is None
 
         # Compose reply
+        self.set_page_headers()
+        # render notebook in snippets, and flush them out to the browser can render progresssively
+        try:
+            async for html_snippet, resources in self.exporter.generate_from_notebook_node(notebook, resources=resources, extra_context=extra_context):
+                self.write_snippet(html_snippet)
+                if page is not None:
+                    page.append(html_snippet)
+            self.finish_snippets()
+            if page is not None:
+                self.page_cache.put(self.page_key, ''.join(page), page_ttl)
+                self.page_key = None
+        finally:
+            self._release_page()
+            if self.kernel_started and self.kernel_culler is not None:
+                self.kernel_culler.render_finished(self.kernel_id)
+            if self.kernel_started and page_ttl > 0:
+                # the cached page is served without a kernel, so the kernel of this render is not used either
+                await ensure_async(self.kernel_manager.shutdown_kernel(self.kernel_id))
+
+    def write_snippet(self, html_snippet):
+        """Write a snippet of the page, which is flushed once enough bytes or time accumulated.
+
+        Flushing every snippet would send a tiny chunk, with a syscall, for every cell of a notebook.
+        Waiting for a kernel or the execution of a cell always flushes what was written before.
+        """
+        if self.page_compressor is not None:
+            self.write_page(self.page_compressor.compress(html_snippet.encode('utf-8')))
+        else:
+            self.write_page(html_snippet.encode('utf-8'))
+        self.unflushed_size += len(html_snippet)
+        config = self.voila_configuration
+        if self.unflushed_size >= config.flush_min_bytes or time.monotonic() - self.last_flush >= config.flush_interval:
+            self.flush_snippets()
+
+    def flush_snippets(self):
+        """Flush the snippets written so far."""
+        if self.unflushed_size > 0:
+            if self.page_compressor is not None:
+                # the browser can only show what the compressor does not hold back
+                self.write_page(self.page_compressor.flush())
+            self.flush()
+            self._observe_first_byte()
+        self.unflushed_size = 0
+        self.last_flush = time.monotonic()
+
+    def finish_snippets(self):
+        """Flush the last snippets of the page."""
+        if self.page_compressor is not None:
+            self.write_page(self.page_compressor.finish())
+            self.page_compressor = None
+        self.flush()
+        self._observe_first_byte()
+        self.unflushed_size = 0
+        self.last_flush = time.monotonic()
+
+    def write_page(self, data):
+        self.write(data)
+        STREAMED_BYTES.inc(len(data))
+
+    def _observe_first_byte(self):
+        if not self.first_byte_sent and self.metrics_labels is not None:
+            self.first_byte_sent = True
+            TIME_TO_FIRST_BYTE.labels(*self.metrics_labels).observe(self.request.request_time())
+
+    def _jinja_flush(self):
+        self.flush_snippets()
+        return ''
+
+    def set_page_headers(self):
         self.set_header('Content-Type', 'text/html')
         self.set_header('Cache-Control', 'no-cache, no-store, must-revalidate')
         self.set_header('Pragma', 'no-cache')
         self.set_header('Expires', '0')
-        # render notebook in snippets, and flush them out to the browser can render progresssively
-        async for html_snippet, resources in self.exporter.generate_from_notebook_node(notebook, resources=resources, extra_context=extra_context):
-            self.write(html_snippet)
-            self.flush()  # we may not want to consider not flusing after each snippet, but add an explicit flush function to the jinja context
-            # yield  # give control back to tornado's IO loop, so it can handle static files or other requests
-        self.flush()
+        self.page_compressor = self.get_page_compressor()
+        if self.page_compressor is not None:
+            self.set_header('Content-Encoding', self.page_compressor.encoding)
+            self.add_header('Vary', 'Accept-Encoding')
+
+    def get_page_compressor(self):
+        """A StreamCompressor for the encoding the browser prefers, or None."""
+        config = self.voila_configuration
+        if not config.compress_pages:
+            return None
+        accepted = accepted_encodings(self.request.headers.get('Accept-Encoding', ''))
+        if brotli is not None and accepted.get('br', 0) > 0:
+            return StreamCompressor('br', config.page_brotli_quality)
+        if accepted.get('gzip', 0) > 0:
+            return StreamCompressor('gzip', config.page_gzip_level)
+        return None
+
+    def get_page_cache_ttl(self, notebook):
+        """The time to live in seconds of the cached page of a notebook, which can be set in its metadata (0 is not cached)"""
+        voila_metadata = notebook.metadata.get('voila', {})
+        return voila_metadata.get('page_cache_ttl', self.voila_configuration.page_cache_ttl)
+
+    def on_finish(self):
+        self._release_render_ticket()
+        self._release_page()
+        if self.rendering and self.metrics_labels is not None and self.get_status() == 200:
+            RENDER.labels(*self.metrics_labels).observe(self.request.request_time())
+        self._end_render()
+
+    def on_connection_close(self):
+        self._release_render_ticket()
+        self._release_page()
+        self._end_render()
+
+    def _end_render(self):
+        if self.rendering:
+            self.rendering = False
+            RENDERS_IN_PROGRESS.dec()
+
+    def _release_page(self):
+        if self.page_key is not None:
+            self.page_cache.discard(self.page_key)
+            self.page_key = None
+
+    def _release_render_ticket(self):
+        if self.render_ticket is not None:
+            self.render_queue.release(self.render_ticket)
+
+    async def _wait_for_render_slot(self):
+        """Wait until the render is admitted, while the spinner shows the position in the queue"""
+        ticket = self.render_ticket
+        last_position = None
+        last_write = time.time()
+        while not ticket.admitted.done():
+            position = self.render_queue.position(ticket)
+            keep_alive = time.time() - last_write > self.voila_configuration.http_keep_alive_timeout
+            if position != last_position or keep_alive:
+                self.write_snippet("<script>window.voila_queue && voila_queue({})</script>\n".format(position))
+                self.flush_snippets()
+                last_position = position
+                last_write = time.time()
+            await asyncio.wait({ticket.admitted}, timeout=1)
+        if ticket.admitted.cancelled():
+            raise tornado.web.Finish()
+        self.log.debug('Render of %s waited %.3f seconds in the queue', ticket.notebook_path, ticket.admitted.result())
+
+    def get_exporter(self, template_name, theme):
+        """Returns a VoilaExporter, which is shared by the requests using the same template and theme.
+
+        Creating an exporter creates its Jinja environment and compiles the templates, which is
+        slow compared to rendering a small notebook.
+        """
+        exporters = self.settings.get('voila_exporters')
+        key = (tuple(self.template_paths), template_name, theme, self.voila_configuration.strip_sources)
+        exporter = exporters.get(key) if exporters is not None else None
+        if exporter is not None:
+            # parent templates are checked by the Jinja environment itself
+            if self.settings.get('autoreload') and not exporter.template.is_up_to_date:
+                exporter._invalidate_template_cache()
+            return exporter
+
+        exporter = VoilaExporter(
+            template_paths=self.template_paths,
+            template_name=template_name,
+            config=self.traitlet_config,
+            contents_manager=self.contents_manager,  # for the image inlining
+            theme=theme,  # we now have the theme in two places
+            base_url=self.base_url,
+            bytecode_cache=self.settings.get('voila_template_bytecode_cache'),
+            nbextensions_path=self.settings.get('voila_nbextensions_path', []),
+            image_cache=self.settings.get('voila_markdown_image_cache'),
+            markdown_cache=self.settings.get('voila_markdown_cache'),
+            io_executor=self.settings.get('voila_io_executor'),
+            render_pool=self.settings.get('voila_render_pool'),
+            inline_images=self.voila_configuration.inline_markdown_images,
+        )
+        if self.voila_configuration.strip_sources:
+            exporter.exclude_input = True
+            exporter.exclude_output_prompt = True
+            exporter.exclude_input_prompt = True
+        # only check if the templates were modified when we autoreload
+        exporter.environment.auto_reload = bool(self.settings.get('autoreload'))
+        if exporters is not None:
+            exporters.put(key, exporter, 1)
+        return exporter
 
     def redirect_to_file(self, path):
         self.redirect(url_path_join(self.base_url, 'voila', 'files', path))
 
     async def _jinja_kernel_start(self, nb):
         assert not self.kernel_started, "kernel was already started"
-
-        kernel_id = await ensure_async(self.kernel_manager.start_kernel(
-           kernel_name=nb.metadata.kernelspec.name,
-           path=self.cwd,
-           env=self.kernel_env,
-        ))
+        # the page so far (with the spinner) is shown while the kernel starts
+        self.flush_snippets()
+
+        if self.render_ticket is not None:
+            await self._wait_for_render_slot()
+
+        kernel_name = nb.metadata.kernelspec.name
+        started = time.monotonic()
+        pooled = None
+        if self.kernel_pool is not None and self.kernel_pool.can_pool(nb.metadata.kernelspec.language):
+            pooled = await self.kernel_pool.get(kernel_name, self.cwd, nb, self.render_path)
+        if pooled is None:
+            kernel_id = await ensure_async(self.kernel_manager.start_kernel(
+               kernel_name=kernel_name,
+               path=self.cwd,
+               env=self.kernel_env,
+            ))
+        else:
+            kernel_id, self.warm_cells = pooled
+            self.log.debug('Using kernel %s from the pool, with %d executed cells', kernel_id, len(self.warm_cells))
         km = self.kernel_manager.get_kernel(kernel_id)
+        KERNEL_START.labels(*self.metrics_labels).observe(time.monotonic() - started)
 
         self.executor = VoilaExecutor(nb, km=km, config=self.traitlet_config)
+        self.executor.on_cell_executed = self._on_cell_executed
 
         ###
         # start kernel client
         self.executor.kc = km.client()
         await ensure_async(self.executor.kc.start_channels())
+        started = time.monotonic()
         await ensure_async(self.executor.kc.wait_for_ready(timeout=self.executor.startup_timeout))
+        KERNEL_WAIT_FOR_READY.labels(*self.metrics_labels).observe(time.monotonic() - started)
         self.executor.kc.allow_stdin = False
         ###
+        if pooled is not None:
+            await self._inject_kernel_env()
 
+        if self.kernel_culler is not None:
+            self.kernel_culler.watch(kernel_id)
         self.kernel_started = True
+        self.kernel_id = kernel_id
+        if self.page_ttl > 0:
+            # like a snapshot, the cached page does not connect to a kernel: this one is shut down once it is rendered
+            return ''
         return kernel_id
 
+    def _on_cell_executed(self, cell, duration):
+        CELL_EXECUTION.labels(*self.metrics_labels).observe(duration)
+
+    async def _inject_kernel_env(self):
+        """Set the request specific environment variables in a kernel that was started before the request"""
+        code = 'import os as _voila_os\n_voila_os.environ.update({!r})\ndel _voila_os'.format(self.request_env)
+        msg_id = self.executor.kc.execute(code, silent=True, store_history=False)
+        await self.executor.async_wait_for_reply(msg_id)
+
     async def _jinja_notebook_execute(self, nb, kernel_id):
+        self.flush_snippets()
+        warm_cells = self.warm_cells
+        # only execute the cells that were not executed ahead of time
+        nb.cells = nb.cells[len(warm_cells):]
         result = await self.executor.async_execute(cleanup_kc=False)
         # we modify the notebook in place, since the nb variable cannot be reassigned it seems in jinja2
         # e.g. if we do {% with nb = notebook_execute(nb, kernel_id) %}, the base template/blocks will not
         # see the updated variable (it seems to be local to our block)
-        nb.cells = result.cells
+        nb.cells = [self._store_outputs(cell, kernel_id) for cell in warm_cells + result.cells]
 
-    async def _jinja_cell_generator(self, nb, kernel_id):
+    @contextfunction
+    async def _jinja_cell_generator(self, context, nb, kernel_id):
         """Generator that will execute a single notebook cell at a time"""
         nb, resources = ClearOutputPreprocessor().preprocess(nb, {'metadata': {'path': self.cwd}})
+        stream_outputs = self.stream_partial_outputs and PartialOutputs.can_render(context)
         for cell_idx, input_cell in enumerate(nb.cells):
+            if cell_idx < len(self.warm_cells):
+                # replay the outputs of the cells executed ahead of time
+                yield self._store_outputs(self.warm_cells[cell_idx], kernel_id)
+                continue
+            partial_outputs = None
+            if input_cell.cell_type == 'code':
+                # the cells rendered so far are shown while this one executes
+                self.flush_snippets()
+                if stream_outputs:
+                    partial_outputs = PartialOutputs(context, input_cell, cell_idx, self._write_partial_outputs,
+                                                     strip_errors=self.executor.should_strip_error(),
+                                                     max_outputs=self.voila_configuration.max_partial_outputs,
+                                                     store_output=functools.partial(self._store_output, kernel_id=kernel_id))
             try:
-                task = asyncio.ensure_future(self.executor.execute_cell(input_cell, None, cell_idx, store_history=False))
-                while True:
-                    done, pending = await asyncio.wait({task}, timeout=self.voila_configuration.http_keep_alive_timeout)
-                    if pending:
-                        # If not done within the timeout, we send a heartbeat
-                        # this is fundamentally to avoid browser/proxy read-timeouts, but
-                        # can be used in a template to give feedback to a user
-                        self.write("<script>voila_heartbeat()</script>\n")
-                        self.flush()
-                        continue
-                    output_cell = await task
-                    break
+                output_cell = await self._execute_cell(input_cell, cell_idx, partial_outputs)
             except TimeoutError:
                 output_cell = input_cell
                 break
@@ -237,24 +558,102 @@ class VoilaHandler(JupyterHandler):
                         }
                     ]
             finally:
-                yield output_cell
+                if partial_outputs is not None:
+                    partial_outputs.remove()
+                yield self._store_outputs(output_cell, kernel_id)
+
+    async def _execute_cell(self, cell, cell_idx, partial_outputs=None):
+        """Execute a cell, while sending heartbeats, or the outputs of the cell as they are produced"""
+        changed = asyncio.Event()
+
+        def on_cell_output(output_cell, msg):
+            if output_cell is cell:
+                partial_outputs.on_message(msg)
+                changed.set()
+        self.executor.on_cell_output = on_cell_output if partial_outputs is not None else None
+        task = asyncio.ensure_future(self.executor.execute_cell(cell, None, cell_idx, store_history=False))
+        last_write = time.monotonic()
+        try:
+            while True:
+                waiter = asyncio.ensure_future(changed.wait())
+                done, pending = await asyncio.wait({task, waiter}, timeout=self.voila_configuration.http_keep_alive_timeout,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                if task in done:
+                    return await task
+                if changed.is_set():
+                    changed.clear()
+                    started = time.monotonic()
+                    if await partial_outputs.update():
+                        last_write = time.monotonic()
+                    # the outputs of a cell printing in a loop are sent at most every flush_interval, and rendering
+                    # them takes at most a tenth of the time, so that the messages of the kernel are processed in time
+                    interval = max(self.voila_configuration.flush_interval, 10 * (time.monotonic() - started))
+                    await asyncio.wait({task}, timeout=interval)
+                elif time.monotonic() - last_write >= self.voila_configuration.http_keep_alive_timeout:
+                    # If not done within the timeout, we send a heartbeat
+                    # this is fundamentally to avoid browser/proxy read-timeouts, but
+                    # can be used in a template to give feedback to a user
+                    self.write_snippet("<script>voila_heartbeat()</script>\n")
+                    self.flush_snippets()
+                    last_write = time.monotonic()
+        finally:
+            self.executor.on_cell_output = None
+
+    def _write_partial_outputs(self, html_snippet):
+        self.write_snippet(html_snippet)
+        self.flush_snippets()
+
+    async def _jinja_snapshot_kernel_start(self, nb):
+        # there is no kernel, the page does not connect to one
+        return ''
+
+    async def _jinja_snapshot_notebook_execute(self, nb, kernel_id):
+        # the cells of a snapshot were executed in the background
+        nb.cells = [self._store_outputs(cell) for cell in nb.cells]
+
+    async def _jinja_snapshot_cell_generator(self, nb, kernel_id):
+        for cell in nb.cells:
+            yield self._store_outputs(cell)
+
+    def _store_outputs(self, cell, kernel_id=None):
+        """Replace the large outputs of a cell by references to the output store."""
+        if self.store_outputs and cell.cell_type == 'code':
+            cell.outputs = [self._store_output(output, kernel_id) for output in cell.outputs]
+        return cell
+
+    def _store_output(self, output, kernel_id=None):
+        if not self.store_outputs:
+            return output
+        return self.output_store.store_output(output, url_path_join(self.base_url, 'voila/outputs/'), kernel_id)
 
     async def load_notebook(self, path):
-        model = self.contents_manager.get(path=path)
+        cache_key = None
+        if self.notebook_cache is not None and self.notebook_cache.enabled:
+            # getting the model without its content only needs a stat of the file
+            model = await self.io_executor.run('contents.stat', self.contents_manager.get, path=path, content=False)
+            cache_key = self.notebook_cache.key(model)
+            notebook = self.notebook_cache.get(cache_key)
+            if notebook is not None:
+                return notebook
+        # an async contents manager reads the file in a thread, and checks the trust of the notebook on
+        # the event loop, which a sync one can only do on the event loop (see IOExecutor.call)
+        model = await self.io_executor.call('contents.get', self.contents_manager.get, path=path)
         if 'content' not in model:
             raise tornado.web.HTTPError(404, 'file not found')
         __, extension = os.path.splitext(model.get('path', ''))
         if model.get('type') == 'notebook':
             notebook = model['content']
             notebook = await self.fix_notebook(notebook)
-            return notebook
         elif extension in self.voila_configuration.extension_language_mapping:
             language = self.voila_configuration.extension_language_mapping[extension]
             notebook = await self.create_notebook(model, language=language)
-            return notebook
         else:
             self.redirect_to_file(path)
             return None
+        if cache_key is not None:
+            notebook = self.notebook_cache.put(cache_key, notebook, size=model.get('size'))
+        return notebook
 
     async def fix_notebook(self, notebook):
         """Returns a notebook object with a valid kernelspec.
@@ -267,12 +666,11 @@ class VoilaHandler(JupyterHandler):
             notebook.metadata.kernelspec = nbformat.NotebookNode()
         kernelspec = notebook.metadata.kernelspec
         kernel_name = kernelspec.get('name', self.kernel_manager.default_kernel_name)
-        # We use `maybe_future` to support RemoteKernelSpecManager
-        all_kernel_specs = await tornado.gen.maybe_future(self.kernel_spec_manager.get_all_specs())
+        all_kernel_specs = await self.get_all_kernel_specs()
         # Find a spec matching the language if the kernel name does not exist in the kernelspecs
         if kernel_name not in all_kernel_specs:
             missing_kernel_name = kernel_name
-            kernel_name = await self.find_kernel_name_for_language(kernelspec.language.lower(), kernel_specs=all_kernel_specs)
+            kernel_name = await self.find_kernel_name_for_language(kernelspec.language.lower())
             self.log.warning('Could not find a kernel named %r, will use  %r', missing_kernel_name, kernel_name)
         # We make sure the notebook's kernelspec is correct
         notebook.metadata.kernelspec.name = kernel_name
@@ -281,8 +679,8 @@ class VoilaHandler(JupyterHandler):
         return notebook
 
     async def create_notebook(self, model, language):
-        all_kernel_specs = await tornado.gen.maybe_future(self.kernel_spec_manager.get_all_specs())
-        kernel_name = await self.find_kernel_name_for_language(language, kernel_specs=all_kernel_specs)
+        all_kernel_specs = await self.get_all_kernel_specs()
+        kernel_name = await self.find_kernel_name_for_language(language)
         spec = all_kernel_specs[kernel_name]
         notebook = nbformat.v4.new_notebook(
             metadata={
@@ -303,15 +701,18 @@ class VoilaHandler(JupyterHandler):
         """
         if kernel_language in self.voila_configuration.language_kernel_mapping:
             return self.voila_configuration.language_kernel_mapping[kernel_language]
-        if kernel_specs is None:
-            kernel_specs = await tornado.gen.maybe_future(self.kernel_spec_manager.get_all_specs())
-        matches = [
-            name for name, kernel in kernel_specs.items()
-            if kernel["spec"]["language"].lower() == kernel_language.lower()
-        ]
-        if matches:
-            # Sort by display name to get the same kernel each time.
-            matches.sort(key=lambda name: kernel_specs[name]["spec"]["display_name"])
-            return matches[0]
+        if kernel_specs is None and self.kernelspec_registry is not None:
+            kernel_name = await self.kernelspec_registry.find_kernel_name(kernel_language)
         else:
+            if kernel_specs is None:
+                kernel_specs = await self.get_all_kernel_specs()
+            kernel_name = language_kernel_names(kernel_specs).get(kernel_language.lower())
+        if kernel_name is None:
             raise tornado.web.HTTPError(500, 'No Jupyter kernel for language %r found' % kernel_language)
+        return kernel_name
+
+    async def get_all_kernel_specs(self):
+        if self.kernelspec_registry is not None:
+            return await self.kernelspec_registry.get_all_specs()
+        # We use `maybe_future` to support RemoteKernelSpecManager
+        return await tornado.gen.maybe_future(self.kernel_spec_manager.get_all_specs())
@@ -0,0 +1,93 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import base64
+import hashlib
+import mimetypes
+import posixpath
+import threading
+
+import tornado.web
+
+from traitlets import Int
+from traitlets.config import LoggingConfigurable
+
+from .cache import LRUCache
+
+
+class MarkdownImage(object):
+    """An image referenced by a markdown cell."""
+
+    def __init__(self, path, data):
+        # the path relative to the root of the contents manager
+        self.path = path
+        # the version of the file in the urls, see VersionedUrlMixin
+        self.hash = hashlib.sha512(data).hexdigest()
+        self.data_uri = None
+
+    def inline(self, data):
+        mime_type, encoding = mimetypes.guess_type(self.path)
+        self.data_uri = 'data:{mime_type};base64,{data}'.format(mime_type=mime_type, data=base64.b64encode(data).decode('ascii'))
+
+
+class MarkdownImageCache(LoggingConfigurable):
+    """Keeps the images of the markdown cells, so that they are not read and encoded on every render.
+
+    Entries are keyed by the path, modification time and size of the file, so that a modified
+    file is read again. Images that are not inlined only keep the hash of their content.
+    """
+
+    max_size = Int(64 * 1024 * 1024, help='''
+    Memory budget in bytes of the inlined markdown images (0 disables the cache).
+    ''').tag(config=True)
+
+    def __init__(self, **kwargs):
+        super(MarkdownImageCache, self).__init__(**kwargs)
+        self._cache = LRUCache(self.max_size)
+        # the markdown cells are rendered in the threads of the IOExecutor
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, contents_manager, path, inline=True):
+        """Returns a MarkdownImage for a file of the contents manager, or None if the file does not exist."""
+        try:
+            # getting the model without its content only needs a stat of the file
+            model = contents_manager.get(path, content=False)
+        except tornado.web.HTTPError:
+            return None
+        if model.get('type') != 'file':
+            return None
+        path = posixpath.normpath(model['path'])
+        key = (path, model.get('last_modified'), model.get('size'), inline)
+        with self._lock:
+            image = self._cache.get(key)
+        if image is None:
+            data = base64.b64decode(contents_manager.get(path, format='base64')['content'])
+            image = MarkdownImage(path, data)
+            if inline:
+                image.inline(data)
+            with self._lock:
+                # older versions of the file will never be requested again
+                for old_key in self._cache.keys():
+                    if old_key[0] == key[0] and old_key[3] == inline:
+                        self._cache.pop(old_key)
+                self._cache.put(key, image, len(image.data_uri or '') + len(image.hash))
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    @property
+    def stats(self):
+        return self._cache.stats
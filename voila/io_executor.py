@@ -0,0 +1,88 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import concurrent.futures
+import functools
+import inspect
+import time
+
+from tornado.ioloop import IOLoop
+from traitlets import Int
+from traitlets.config import LoggingConfigurable
+
+
+class IOExecutor(LoggingConfigurable):
+    """Runs the blocking calls to the contents and config managers in a thread pool.
+
+    These calls read files, which can take a while on a slow (e.g. network) file system, and
+    would block the event loop, and with it every websocket and render of the process. The
+    methods of an async contents manager are awaited instead. The calls are timed by name,
+    to see how much time is taken off the event loop (see `stats`).
+    """
+
+    max_workers = Int(8, help='''
+    Maximum number of threads doing blocking file system calls (0 makes the calls on the event loop).
+    ''').tag(config=True)
+
+    def __init__(self, **kwargs):
+        super(IOExecutor, self).__init__(**kwargs)
+        self._executor = None
+        # maps the names of the call sites to their number of calls, and total and maximum duration
+        self._stats = {}
+
+    async def run(self, name, func, *args, **kwargs):
+        """Call func, in the thread pool unless it is a coroutine function."""
+        return await self._run(name, self.max_workers > 0, func, *args, **kwargs)
+
+    async def call(self, name, func, *args, **kwargs):
+        """Call func on the event loop, timed like the calls of `run`.
+
+        For the calls that cannot be made from another thread, such as reading a notebook with a
+        sync contents manager: its trust is checked with nbformat's signature store, a sqlite
+        connection that can only be used by the thread that opened it.
+        """
+        return await self._run(name, False, func, *args, **kwargs)
+
+    async def _run(self, name, in_pool, func, *args, **kwargs):
+        started = time.monotonic()
+        try:
+            if inspect.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            if in_pool:
+                result = await IOLoop.current().run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+            else:
+                result = func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        finally:
+            self._record(name, time.monotonic() - started)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='voila-io')
+        return self._executor
+
+    def _record(self, name, duration):
+        stats = self._stats.setdefault(name, {'calls': 0, 'seconds': 0., 'max_seconds': 0.})
+        stats['calls'] += 1
+        stats['seconds'] += duration
+        stats['max_seconds'] = max(stats['max_seconds'], duration)
+        if duration > 0.1:
+            self.log.debug('%s took %.3f seconds', name, duration)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @property
+    def stats(self):
+        return {name: dict(stats) for name, stats in self._stats.items()}
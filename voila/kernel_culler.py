@@ -0,0 +1,115 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+import time
+
+from tornado.ioloop import PeriodicCallback
+
+from dateutil.parser import parse as parse_date
+from traitlets import Any
+from traitlets.config import LoggingConfigurable
+
+from jupyter_server._tz import utcnow
+from nbclient.util import ensure_async
+
+
+class KernelCuller(LoggingConfigurable):
+    """Shuts down the kernels of pages that are not used anymore.
+
+    Only the kernels that were handed out to a page are watched (see `watch`), so that
+    kernels waiting in the `KernelPool` are left alone. The rules are configured on
+    `VoilaConfiguration`: a kernel is culled when no websocket was connected to it for
+    `cull_unconnected_timeout` seconds after the page was rendered, when it has been used
+    for more than `cull_max_age` seconds, or when no message was sent on its iopub channel
+    (for a page that is rendered, these are mostly comm messages) for `cull_idle_timeout` seconds.
+    """
+    kernel_manager = Any()
+    voila_configuration = Any()
+
+    def __init__(self, **kwargs):
+        super(KernelCuller, self).__init__(**kwargs)
+        # maps kernel ids to a dict with the times the kernel was handed out and last seen connected
+        self._kernels = {}
+        self.culled = {
+            'unconnected': 0,
+            'max_age': 0,
+            'idle': 0,
+        }
+        self._callback = None
+
+    @property
+    def enabled(self):
+        config = self.voila_configuration
+        return any(timeout > 0 for timeout in [config.cull_unconnected_timeout, config.cull_max_age, config.cull_idle_timeout])
+
+    def watch(self, kernel_id):
+        """Start watching a kernel that is used by a page."""
+        if not self.enabled:
+            return
+        now = time.time()
+        self._kernels[kernel_id] = {
+            'started': now,
+            'last_connected': now,
+            'rendering': True,
+        }
+        self._start()
+
+    def render_finished(self, kernel_id):
+        """The page was sent, from now on we expect a websocket connection to the kernel."""
+        if kernel_id in self._kernels:
+            self._kernels[kernel_id]['rendering'] = False
+            self._kernels[kernel_id]['last_connected'] = time.time()
+
+    def _start(self):
+        if self._callback is None:
+            interval = self.voila_configuration.cull_interval
+            self.log.info('Culling kernels every %s seconds', interval)
+            self._callback = PeriodicCallback(self.cull_kernels, 1000 * interval)
+            self._callback.start()
+
+    def stop(self):
+        if self._callback is not None:
+            self._callback.stop()
+            self._callback = None
+
+    async def cull_kernels(self):
+        for kernel_id in list(self._kernels):
+            if kernel_id not in self.kernel_manager:
+                self._kernels.pop(kernel_id)
+                continue
+            try:
+                reason = self._cull_reason(kernel_id)
+                if reason:
+                    self._kernels.pop(kernel_id)
+                    self.culled[reason] += 1
+                    self.log.info('Culling kernel %s (%s), %d kernels culled for that reason so far', kernel_id, reason, self.culled[reason])
+                    await ensure_async(self.kernel_manager.shutdown_kernel(kernel_id))
+            except Exception:
+                self.log.exception('Error while culling kernel %s', kernel_id)
+
+    def _cull_reason(self, kernel_id):
+        config = self.voila_configuration
+        info = self._kernels[kernel_id]
+        now = time.time()
+        if config.cull_max_age > 0 and now - info['started'] > config.cull_max_age:
+            return 'max_age'
+        if info['rendering']:
+            return None
+        # the model the kernels API serves, with the number of websockets and the time of the last iopub message
+        model = self.kernel_manager.kernel_model(kernel_id)
+        if config.cull_unconnected_timeout > 0:
+            if model.get('connections', 0) > 0:
+                info['last_connected'] = now
+            elif now - info['last_connected'] > config.cull_unconnected_timeout:
+                return 'unconnected'
+        if config.cull_idle_timeout > 0:
+            last_activity = model.get('last_activity')
+            if last_activity and (utcnow() - parse_date(last_activity)).total_seconds() > config.cull_idle_timeout:
+                return 'idle'
+        return None
@@ -0,0 +1,285 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import time
+
+from tornado.ioloop import PeriodicCallback
+
+from traitlets import Any, Float, Int, Unicode
+from traitlets.config import LoggingConfigurable
+
+import nbformat
+from nbclient.util import ensure_async
+from nbconvert.preprocessors import ClearOutputPreprocessor
+
+from ._version import __version__
+from .execute import VoilaExecutor
+
+
+class KernelPool(LoggingConfigurable):
+    """A pool of started and ready kernels, one pool per kernel name and working directory.
+
+    Kernels are started in the background, so that a page load can take a kernel
+    that is ready to execute code instead of waiting for a kernel to start.
+    Request specific environment variables (such as QUERY_STRING) cannot be known
+    at the time a kernel is started, so they are injected once the kernel is claimed.
+    Since that requires running code in the kernel, only Python kernels are pooled.
+
+    A notebook can mark a prefix of its cells, which does not depend on the request, to be
+    executed ahead of time in the pooled kernels, see `warmup_cells`. A page load then
+    gets the executed prefix cells together with the kernel, and only executes the remaining cells.
+    """
+    kernel_manager = Any()
+
+    pool_size = Int(0, help='''
+    Number of ready kernels to keep for each kernel name and notebook directory (0 disables the pool).
+    ''').tag(config=True)
+
+    max_age = Float(0, help='''
+    Maximum time in seconds a kernel is kept in the pool before it is replaced by a new one (0 means no limit).
+    ''').tag(config=True)
+
+    fill_delay = Float(1, help='''
+    Time in seconds to wait between two kernel starts when refilling a pool, limiting the refill rate.
+    ''').tag(config=True)
+
+    startup_timeout = Int(60, help='''
+    Time in seconds to wait for a kernel in the pool to become ready.
+    ''').tag(config=True)
+
+    warmup_tag = Unicode('voila-warmup', help='''
+    Cell tag marking the leading code cells of a notebook that are executed ahead of time in the pooled kernels.
+    ''').tag(config=True)
+
+    retry_delay = Float(10, help='''
+    Time in seconds to wait before filling a pool again after it failed (for instance because a warmup cell raised).
+    The delay doubles after each consecutive failure, up to 10 minutes.
+    ''').tag(config=True)
+
+    def __init__(self, **kwargs):
+        super(KernelPool, self).__init__(**kwargs)
+        # maps (kernel_name, path, warmup digest) to a list of (kernel_id, start time, executed cells) tuples
+        self._pools = {}
+        # maps the same keys to the cells to execute in a new kernel
+        self._warmup = {}
+        # maps (kernel_name, path, notebook path) to the key of the pool currently used by that notebook
+        self._notebook_keys = {}
+        # maps keys to the last time a kernel was requested from their pool
+        self._requested = {}
+        self._filling = set()
+        # maps keys whose pool failed to fill to (consecutive failures, time before which we do not retry)
+        self._failures = {}
+        self._expiry_callback = None
+        self._stopped = False
+
+    @property
+    def enabled(self):
+        return self.pool_size > 0
+
+    def can_pool(self, language):
+        return self.enabled and language.lower() == 'python'
+
+    def warmup_cells(self, nb):
+        """Returns the prefix of cells of a notebook that can be executed ahead of time.
+
+        The prefix is given by the number of leading cells in the notebook metadata (voila.warmup_cells),
+        or otherwise it ends at the first code cell that is not tagged with `warmup_tag`.
+        """
+        count = nb.metadata.get('voila', {}).get('warmup_cells')
+        if count is None:
+            count = 0
+            for index, cell in enumerate(nb.cells):
+                if cell.cell_type == 'code':
+                    if self.warmup_tag not in cell.metadata.get('tags', []):
+                        break
+                    count = index + 1
+        return nb.cells[:count]
+
+    async def get(self, kernel_name, path, nb=None, notebook_path=None):
+        """Take a ready kernel out of the pool, returns None if none is available.
+
+        If a notebook is passed, the kernel has executed the warmup cells of that notebook,
+        and a (kernel_id, executed_cells) tuple is returned. The pool is (re)filled in the
+        background, so that a next request can be served from the pool. When the notebook path
+        is passed too, the pool for a previous version of its warmup cells is shut down.
+        """
+        key = self._register(kernel_name, path, nb, notebook_path)
+        pool = self._pools.setdefault(key, [])
+        result = None
+        while pool:
+            kernel_id, started, executed_cells = pool.pop(0)
+            if kernel_id not in self.kernel_manager:
+                continue
+            if self._is_expired(started):
+                await self._shutdown(kernel_id)
+                continue
+            result = (kernel_id, executed_cells)
+            break
+        self._start_expiry_callback()
+        self.fill(key)
+        return result
+
+    def prefill(self, kernel_name, path, nb=None, notebook_path=None):
+        """Start filling the pool a later `get` with the same arguments takes its kernel from.
+
+        This is used when the notebook is known in advance, so that even the first page load gets a ready kernel.
+        """
+        if not self.enabled:
+            return
+        key = self._register(kernel_name, path, nb, notebook_path)
+        self._start_expiry_callback()
+        self.fill(key)
+
+    def _register(self, kernel_name, path, nb, notebook_path):
+        # returns the key of the pool for a notebook, and retires the pool of its previous warmup cells
+        cells = self.warmup_cells(nb) if nb is not None else []
+        key = (kernel_name, path, self._digest(cells))
+        if cells:
+            self._warmup[key] = (nb.metadata, cells)
+        self._requested[key] = time.time()
+        if notebook_path is not None:
+            notebook_key = (kernel_name, path, notebook_path)
+            previous_key = self._notebook_keys.get(notebook_key)
+            self._notebook_keys[notebook_key] = key
+            if previous_key is not None and previous_key != key:
+                self._retire(previous_key)
+        return key
+
+    def _retire(self, key):
+        # pools without warmup cells are shared by all notebooks in a directory, and pools
+        # for warmup cells can be shared by notebooks with the same warmup cells
+        if key[2] is None or key in self._notebook_keys.values():
+            return
+        self.log.debug('The warmup cells for %r are not used anymore, shutting down its pool', key)
+        for kernel_id, started, executed_cells in self._remove(key):
+            asyncio.ensure_future(self._shutdown(kernel_id))
+
+    def _remove(self, key):
+        self._warmup.pop(key, None)
+        self._requested.pop(key, None)
+        self._failures.pop(key, None)
+        return self._pools.pop(key, [])
+
+    def fill(self, key):
+        """Start filling the pool for a key in the background."""
+        if not self.enabled or self._stopped or key in self._filling:
+            return
+        failures, retry_at = self._failures.get(key, (0, 0))
+        if time.time() < retry_at:
+            return
+        self._filling.add(key)
+        asyncio.ensure_future(self._fill(key, self._pools.setdefault(key, [])))
+
+    async def _fill(self, key, pool):
+        try:
+            while len(pool) < self.pool_size and not self._stopped:
+                started = time.time()
+                kernel_id, executed_cells = await self._start_kernel(key)
+                if self._stopped or self._pools.get(key) is not pool:
+                    # stopped, or retired while the kernel was starting
+                    await self._shutdown(kernel_id)
+                    break
+                pool.append((kernel_id, started, executed_cells))
+                self._failures.pop(key, None)
+                self.log.debug('Kernel %s added to the pool for %r (%d/%d)', kernel_id, key, len(pool), self.pool_size)
+                if len(pool) < self.pool_size:
+                    await asyncio.sleep(self.fill_delay)
+        except Exception:
+            failures = self._failures.get(key, (0, 0))[0] + 1
+            delay = min(self.retry_delay * 2 ** (failures - 1), 600)
+            self.log.exception('Error while filling the kernel pool for %r, retrying in %d seconds at the earliest', key, delay)
+            if self._pools.get(key) is pool:
+                self._failures[key] = (failures, time.time() + delay)
+        finally:
+            self._filling.discard(key)
+
+    async def _start_kernel(self, key):
+        kernel_name, path, digest = key
+        env = os.environ.copy()
+        env['SERVER_SOFTWARE'] = 'voila/{}'.format(__version__)
+        kernel_id = await ensure_async(self.kernel_manager.start_kernel(
+            kernel_name=kernel_name,
+            path=path,
+            env=env,
+        ))
+        km = self.kernel_manager.get_kernel(kernel_id)
+        kc = km.client()
+        try:
+            await ensure_async(kc.start_channels())
+            await ensure_async(kc.wait_for_ready(timeout=self.startup_timeout))
+            executed_cells = []
+            if key in self._warmup:
+                executed_cells = await self._execute_warmup(km, kc, *self._warmup[key])
+        except Exception:
+            await self._shutdown(kernel_id)
+            raise
+        finally:
+            kc.stop_channels()
+        return kernel_id, executed_cells
+
+    async def _execute_warmup(self, km, kc, metadata, cells):
+        nb = nbformat.v4.new_notebook(metadata=copy.deepcopy(metadata), cells=copy.deepcopy(cells))
+        nb, resources = ClearOutputPreprocessor().preprocess(nb, {})
+        executor = VoilaExecutor(nb, km=km, parent=self)
+        executor.kc = kc
+        kc.allow_stdin = False
+        # errors are raised (CellExecutionError), we do not want to hand out kernels in an unknown state
+        for cell_index, cell in enumerate(nb.cells):
+            await executor.execute_cell(cell, None, cell_index, store_history=False)
+        return nb.cells
+
+    def _digest(self, cells):
+        if not cells:
+            return None
+        sources = json.dumps([[cell.cell_type, cell.source] for cell in cells])
+        return hashlib.sha256(sources.encode('utf8')).hexdigest()
+
+    def _is_expired(self, started):
+        return self.max_age > 0 and time.time() - started > self.max_age
+
+    def _recently_requested(self, key):
+        # kernels that expire are only replaced for the pools that are still in use
+        return time.time() - self._requested.get(key, 0) < self.max_age
+
+    def _start_expiry_callback(self):
+        if self.max_age <= 0 or self._expiry_callback is not None:
+            return
+        # check at least every minute, but more often for a short max_age
+        interval = min(self.max_age / 2, 60)
+        self._expiry_callback = PeriodicCallback(self._replace_expired, 1000 * interval)
+        self._expiry_callback.start()
+
+    async def _replace_expired(self):
+        for key, pool in list(self._pools.items()):
+            expired = [entry for entry in pool if self._is_expired(entry[1])]
+            for entry in expired:
+                pool.remove(entry)
+                self.log.debug('Kernel %s in the pool for %r reached its maximum age', entry[0], key)
+                await self._shutdown(entry[0])
+            if expired and self._recently_requested(key):
+                self.fill(key)
+            elif not pool and not self._recently_requested(key) and key not in self._filling:
+                self.log.debug('The pool for %r was not used for %d seconds, removing it', key, self.max_age)
+                self._remove(key)
+
+    async def _shutdown(self, kernel_id):
+        if kernel_id in self.kernel_manager:
+            await ensure_async(self.kernel_manager.shutdown_kernel(kernel_id))
+
+    def stop(self):
+        """Stop filling the pools, the kernels themselves are shut down by the kernel manager."""
+        self._stopped = True
+        if self._expiry_callback is not None:
+            self._expiry_callback.stop()
+            self._expiry_callback = None
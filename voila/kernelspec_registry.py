@@ -0,0 +1,94 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import asyncio
+import time
+
+import tornado.gen
+
+from traitlets import Any, Float
+from traitlets.config import LoggingConfigurable
+
+from .io_executor import IOExecutor
+
+
+def language_kernel_names(kernel_specs):
+    """Maps lower cased languages to the name of a kernel for that language.
+
+    If multiple kernels match a language, the one with the first display name is used,
+    so that we get the same kernel each time.
+    """
+    names = sorted(kernel_specs, key=lambda name: kernel_specs[name]['spec']['display_name'])
+    languages = {}
+    for name in names:
+        languages.setdefault(kernel_specs[name]['spec']['language'].lower(), name)
+    return languages
+
+
+class KernelSpecRegistry(LoggingConfigurable):
+    """Caches the kernel specs, so that they are not discovered again on every request.
+
+    Getting all kernel specs walks all Jupyter data directories and reads every kernel.json, which
+    can be slow on network file systems. The specs are fetched once, in the IOExecutor, and refreshed
+    in the background when they are older than `ttl` seconds, while requests keep using the previous specs.
+    """
+    kernel_spec_manager = Any()
+    io_executor = Any(allow_none=True)
+
+    ttl = Float(60, help='''
+    Time in seconds after which the kernel specs are discovered again (0 means on every request).
+    ''').tag(config=True)
+
+    def __init__(self, **kwargs):
+        super(KernelSpecRegistry, self).__init__(**kwargs)
+        self._specs = None
+        self._languages = {}
+        self._fetched = 0
+        self._refreshing = None
+        self.fetches = 0
+
+    async def get_all_specs(self):
+        if self._specs is None or self.ttl <= 0:
+            await self.refresh()
+        elif time.monotonic() - self._fetched > self.ttl:
+            self.refresh()
+        return self._specs
+
+    async def find_kernel_name(self, kernel_language):
+        """Returns the name of a kernel for a language, or None."""
+        await self.get_all_specs()
+        return self._languages.get(kernel_language.lower())
+
+    def refresh(self):
+        """Discover the kernel specs, concurrent calls share the same discovery."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._fetch())
+        return self._refreshing
+
+    async def _fetch(self):
+        try:
+            get_all_specs = self.kernel_spec_manager.get_all_specs
+            io_executor = self.io_executor or IOExecutor(max_workers=0)
+            if tornado.gen.is_coroutine_function(get_all_specs):
+                # a RemoteKernelSpecManager does not block, but its coroutine has to run on the event loop
+                specs = await io_executor.call('kernelspecs', get_all_specs)
+            else:
+                specs = await io_executor.run('kernelspecs', get_all_specs)
+            self._languages = language_kernel_names(specs)
+            self._specs = specs
+            self._fetched = time.monotonic()
+            self.fetches += 1
+            self.log.debug('Found kernel specs: %s', ', '.join(specs))
+        except Exception:
+            if self._specs is None:
+                raise
+            self.log.exception('Error while discovering the kernel specs, keeping the previous ones')
+        finally:
+            self._refreshing = None
@@ -0,0 +1,79 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import hashlib
+import json
+import threading
+
+from traitlets import Int
+from traitlets.config import LoggingConfigurable
+
+from .cache import LRUCache
+
+
+class RenderedMarkdown(object):
+    """The html of a markdown cell, with the images it refers to."""
+
+    def __init__(self, html, images):
+        self.html = html
+        # (src, hash) of the images read from the contents manager, which are checked on every hit
+        self.images = images
+
+
+class MarkdownCache(LoggingConfigurable):
+    """Keeps the html of the markdown cells, shared by all the exporters, so that they are not parsed on every render.
+
+    Entries are keyed by a digest of the source, the attachments and the settings of the renderer.
+    The images read from the contents manager are checked on every hit, so that a modified
+    image renders the cell again.
+    """
+
+    max_size = Int(32 * 1024 * 1024, help='''
+    Memory budget in bytes of the rendered markdown cells (0 disables the cache).
+    ''').tag(config=True)
+
+    def __init__(self, **kwargs):
+        super(MarkdownCache, self).__init__(**kwargs)
+        self._cache = LRUCache(self.max_size)
+        # the markdown cells are rendered in the threads of the IOExecutor
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def key(self, source, attachments, renderer_class, **options):
+        """A digest of everything the html of a cell depends on, apart from the images it refers to."""
+        digest = hashlib.sha256()
+        digest.update(source.encode('utf-8'))
+        digest.update(json.dumps(attachments, sort_keys=True).encode('utf-8'))
+        digest.update('{0.__module__}.{0.__qualname__}'.format(renderer_class).encode('utf-8'))
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            return self._cache.get(key)
+
+    def put(self, key, html, images=()):
+        with self._lock:
+            self._cache.put(key, RenderedMarkdown(html, tuple(images)), len(key) + len(html))
+
+    def pop(self, key):
+        with self._lock:
+            return self._cache.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    @property
+    def stats(self):
+        return self._cache.stats
@@ -0,0 +1,214 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+"""Prometheus metrics of Voilà, served by MetricsHandler.
+
+The durations of the renders are recorded when they happen, in histograms labelled by
+notebook. The state of the kernels and of the caches is only read when the
+metrics are collected, so that they cost nothing between two scrapes.
+"""
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# from a cached page to a notebook executing for minutes
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float('inf'))
+LABELS = ['notebook']
+# in tree mode, the notebooks past this number share a label, so that the number of series is bounded
+MAX_NOTEBOOK_LABELS = 100
+OTHER_NOTEBOOKS = 'other'
+
+# the metrics are not registered in the default registry, which the server extension already exposes at /metrics
+TIME_TO_FIRST_BYTE = Histogram(
+    'voila_time_to_first_byte_seconds',
+    'Time from the request of a page to its first bytes being sent',
+    LABELS, buckets=BUCKETS, registry=None,
+)
+KERNEL_START = Histogram(
+    'voila_kernel_start_seconds',
+    'Time to start the kernel of a page, or to take it from the kernel pool',
+    LABELS, buckets=BUCKETS, registry=None,
+)
+KERNEL_WAIT_FOR_READY = Histogram(
+    'voila_kernel_wait_for_ready_seconds',
+    'Time waiting for the kernel of a page to reply once it is started',
+    LABELS, buckets=BUCKETS, registry=None,
+)
+CELL_EXECUTION = Histogram(
+    'voila_cell_execution_seconds',
+    'Time to execute a code cell',
+    LABELS, buckets=BUCKETS, registry=None,
+)
+RENDER = Histogram(
+    'voila_render_seconds',
+    'Time from the request of a page to its last bytes being sent',
+    LABELS, buckets=BUCKETS, registry=None,
+)
+RENDERS_IN_PROGRESS = Gauge(
+    'voila_renders_in_progress',
+    'Number of pages being rendered',
+    registry=None,
+)
+STREAMED_BYTES = Counter(
+    'voila_streamed_bytes',
+    'Bytes of the pages sent to the browsers (after compression)',
+    registry=None,
+)
+
+RENDER_METRICS = [TIME_TO_FIRST_BYTE, KERNEL_START, KERNEL_WAIT_FOR_READY, CELL_EXECUTION, RENDER,
+                  RENDERS_IN_PROGRESS, STREAMED_BYTES]
+
+# the settings of the caches, and the names they are exposed as
+CACHES = [
+    ('voila_notebook_cache', 'notebook'),
+    ('voila_markdown_image_cache', 'markdown_image'),
+    ('voila_markdown_cache', 'markdown'),
+    ('voila_page_cache', 'page'),
+    ('voila_output_store', 'output'),
+    ('voila_static_asset_cache', 'static_asset'),
+]
+
+_notebook_labels = set()
+
+
+def notebook_label(path):
+    """The label of the metrics of a notebook."""
+    if path in _notebook_labels:
+        return path
+    if len(_notebook_labels) >= MAX_NOTEBOOK_LABELS:
+        return OTHER_NOTEBOOKS
+    _notebook_labels.add(path)
+    return path
+
+
+class SettingsCollector(object):
+    """Collects the state of the kernels, and the stats of the components in the settings of the web application."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._snapshot_store_stats = None
+
+    async def update(self):
+        """Read the stats that are on disk, in the IOExecutor, before the metrics are collected."""
+        store = self._snapshot_store()
+        if store is None:
+            return
+        io_executor = self.settings['voila_io_executor']
+        try:
+            self._snapshot_store_stats = await io_executor.run('snapshot_store.stats', lambda: store.stats)
+        except Exception:
+            self._snapshot_store_stats = None
+            io_executor.log.exception('Could not read the stats of the snapshot store')
+
+    def collect(self):
+        yield from self._collect_kernels()
+        yield from self._collect_render_queue()
+        yield from self._collect_caches()
+        yield from self._collect_calls('voila_io_executor', 'voila_io', 'call', 'blocking file system calls')
+        yield from self._collect_calls('voila_render_pool', 'voila_render_pool', 'fragment', 'fragments rendered by the worker processes')
+        yield from self._collect_snapshots()
+
+    def _collect_kernels(self):
+        kernel_manager = self.settings.get('kernel_manager')
+        if kernel_manager is None:
+            return
+        kernel_ids = kernel_manager.list_kernel_ids()
+        yield GaugeMetricFamily('voila_kernels', 'Number of running kernels', value=len(kernel_ids))
+        # like the KernelCuller, the websockets are counted in the models of the kernels
+        websockets = sum(kernel_manager.kernel_model(kernel_id).get('connections', 0)
+                         for kernel_id in kernel_ids if kernel_id in kernel_manager)
+        yield GaugeMetricFamily('voila_websockets', 'Number of open websockets to the kernels', value=websockets)
+        kernel_culler = self.settings.get('voila_kernel_culler')
+        if kernel_culler is not None:
+            culled = CounterMetricFamily('voila_kernels_culled', 'Number of kernels culled by the KernelCuller', labels=['reason'])
+            for reason, count in kernel_culler.culled.items():
+                culled.add_metric([reason], count)
+            yield culled
+
+    def _collect_render_queue(self):
+        render_queue = self.settings.get('voila_render_queue')
+        if render_queue is None:
+            return
+        stats = render_queue.stats
+        yield GaugeMetricFamily('voila_render_queue_depth', 'Number of renders waiting for a slot', value=stats['depth'])
+        yield GaugeMetricFamily('voila_render_queue_running', 'Number of renders holding a slot', value=stats['running'])
+        yield CounterMetricFamily('voila_render_queue_admitted', 'Number of renders admitted by the render queue', value=stats['admitted'])
+        yield CounterMetricFamily('voila_render_queue_rejected', 'Number of renders rejected by the render queue', value=stats['rejected'])
+        yield GaugeMetricFamily('voila_render_queue_max_wait_seconds', 'Longest wait of a render for a slot', value=stats['max_wait_time'])
+
+    def _collect_caches(self):
+        families = {
+            'entries': GaugeMetricFamily('voila_cache_entries', 'Number of entries in a cache', labels=['cache']),
+            'size': GaugeMetricFamily('voila_cache_size_bytes', 'Size of the entries in a cache', labels=['cache']),
+            'hits': CounterMetricFamily('voila_cache_hits', 'Number of hits of a cache', labels=['cache']),
+            'misses': CounterMetricFamily('voila_cache_misses', 'Number of misses of a cache', labels=['cache']),
+            'evictions': CounterMetricFamily('voila_cache_evictions', 'Number of entries evicted from a cache', labels=['cache']),
+        }
+        for setting, name in CACHES:
+            cache = self.settings.get(setting)
+            if cache is None:
+                continue
+            stats = cache.stats
+            for key, family in families.items():
+                if key in stats:
+                    family.add_metric([name], stats[key])
+        yield from families.values()
+
+    def _collect_calls(self, setting, prefix, label, description):
+        component = self.settings.get(setting)
+        if component is None:
+            return
+        calls = CounterMetricFamily(prefix + '_calls', 'Number of ' + description, labels=[label])
+        seconds = CounterMetricFamily(prefix + '_seconds', 'Total duration of the ' + description, labels=[label])
+        max_seconds = GaugeMetricFamily(prefix + '_max_seconds', 'Longest duration of the ' + description, labels=[label])
+        for name, stats in component.stats.items():
+            calls.add_metric([name], stats['calls'])
+            seconds.add_metric([name], stats['seconds'])
+            max_seconds.add_metric([name], stats['max_seconds'])
+        yield calls
+        yield seconds
+        yield max_seconds
+
+    def _collect_snapshots(self):
+        snapshot_scheduler = self.settings.get('voila_snapshot_scheduler')
+        if snapshot_scheduler is None or not snapshot_scheduler.enabled:
+            return
+        refreshed = GaugeMetricFamily('voila_snapshot_refreshed_timestamp_seconds', 'Time of the last refresh of a snapshot', labels=['notebook'])
+        duration = GaugeMetricFamily('voila_snapshot_refresh_seconds', 'Duration of the last refresh of a snapshot', labels=['notebook'])
+        failed = GaugeMetricFamily('voila_snapshot_refresh_failed', 'Whether the last refresh of a snapshot failed', labels=['notebook'])
+        for path, stats in snapshot_scheduler.stats.items():
+            refreshed.add_metric([path], stats['refreshed'])
+            duration.add_metric([path], stats['duration'])
+            failed.add_metric([path], 0 if stats['error'] is None else 1)
+        yield refreshed
+        yield duration
+        yield failed
+        stats = self._snapshot_store_stats
+        if self._snapshot_store() is not None and stats is not None:
+            yield GaugeMetricFamily('voila_snapshot_store_entries', 'Number of entries in the snapshot store', value=stats['entries'])
+            yield GaugeMetricFamily('voila_snapshot_store_size_bytes', 'Size of the files of the snapshot store', value=stats['size'])
+
+    def _snapshot_store(self):
+        # the store is shared with the page cache
+        snapshot_scheduler = self.settings.get('voila_snapshot_scheduler')
+        if snapshot_scheduler is None or not snapshot_scheduler.enabled:
+            return None
+        store = snapshot_scheduler.store
+        if store is None or not store.enabled:
+            return None
+        return store
+
+
+def create_registry(collector):
+    """A registry with the metrics of the renders, and those of a SettingsCollector."""
+    registry = CollectorRegistry()
+    for metric in RENDER_METRICS:
+        registry.register(metric)
+    registry.register(collector)
+    return registry
@@ -0,0 +1,32 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+import prometheus_client
+from tornado import web
+
+from jupyter_server.base.handlers import JupyterHandler
+
+from .metrics import SettingsCollector, create_registry
+
+
+class MetricsHandler(JupyterHandler):
+    """Serves the Prometheus metrics of Voilà (see voila.metrics)."""
+
+    async def get(self):
+        # like the pages, unless the /metrics endpoint of the server is public too
+        if self.settings.get('authenticate_prometheus', True) and not self.current_user:
+            raise web.HTTPError(403)
+        collector = self.settings.get('voila_metrics_collector')
+        if collector is None:
+            collector = self.settings['voila_metrics_collector'] = SettingsCollector(self.settings)
+            self.settings['voila_metrics_registry'] = create_registry(collector)
+        await collector.update()
+        # the other stats are read on the event loop, which updates them
+        registry = self.settings['voila_metrics_registry']
+        self.set_header('Content-Type', prometheus_client.CONTENT_TYPE_LATEST)
+        self.finish(prometheus_client.generate_latest(registry))
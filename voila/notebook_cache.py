@@ -0,0 +1,90 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import copy
+
+from traitlets import Int
+from traitlets.config import LoggingConfigurable
+
+import nbformat
+
+from .cache import LRUCache
+
+
+def copy_notebook(nb):
+    """A structural copy of a notebook, which is much cheaper than a deep copy.
+
+    The notebook, its cells and their metadata are copied, so that they can be modified.
+    The sources, outputs and attachments of the cells are shared with the original
+    notebook: they can be replaced, but should not be modified in place.
+    """
+    nb_copy = nbformat.NotebookNode(nb)
+    nb_copy.metadata = copy.deepcopy(nb.metadata)
+    nb_copy.cells = [_copy_cell(cell) for cell in nb.cells]
+    return nb_copy
+
+
+def _copy_cell(cell):
+    cell_copy = nbformat.NotebookNode(cell)
+    cell_copy.metadata = copy.deepcopy(cell.metadata)
+    if 'outputs' in cell:
+        cell_copy.outputs = list(cell.outputs)
+    return cell_copy
+
+
+class NotebookCache(LoggingConfigurable):
+    """Keeps the notebooks loaded by the VoilaHandler, so that they are not read, parsed and validated on every request.
+
+    Entries are keyed by the path, modification time and size of the file, so that a modified
+    file is loaded again. The memory used by a notebook is estimated by its file size.
+    """
+
+    max_size = Int(128 * 1024 * 1024, help='''
+    Memory budget in bytes of the notebook cache, estimated from the file sizes (0 disables the cache).
+    ''').tag(config=True)
+
+    def __init__(self, **kwargs):
+        super(NotebookCache, self).__init__(**kwargs)
+        self._cache = LRUCache(self.max_size)
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def key(self, model):
+        """The cache key for a contents model, which can be fetched without its content."""
+        return (model['path'], model.get('last_modified'), model.get('size'))
+
+    def get(self, key):
+        """Returns a copy of a cached notebook, or None."""
+        nb = self._cache.get(key)
+        if nb is None:
+            return None
+        return copy_notebook(nb)
+
+    def put(self, key, nb, size=None):
+        """Cache a notebook (which should not be modified afterwards), and return a copy of it."""
+        if size is None:
+            size = len(nbformat.writes(nb))
+        path = key[0]
+        # older versions of the file will never be requested again
+        for old_key in self._cache.keys():
+            if old_key[0] == path:
+                self._cache.pop(old_key)
+        self._cache.put(key, nb, size)
+        self.log.debug('Notebook cache: %(entries)d notebooks, %(size)d bytes, %(hits)d hits, %(misses)d misses', self._cache.stats)
+        return copy_notebook(nb)
+
+    def clear(self):
+        self._cache.clear()
+
+    @property
+    def stats(self):
+        return self._cache.stats
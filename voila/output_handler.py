@@ -0,0 +1,33 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+from tornado import web
+
+from jupyter_server.base.handlers import JupyterHandler
+
+
+class OutputHandler(JupyterHandler):
+    """Serves the outputs of the OutputStore, by the hash of their content."""
+
+    @web.authenticated
+    def get(self, digest):
+        output_store = self.settings.get('voila_output_store')
+        output = output_store.get(digest) if output_store is not None else None
+        if output is None:
+            raise web.HTTPError(404)
+        self.digest = digest
+        content_type = output.mimetype
+        if content_type.startswith('text/'):
+            content_type += '; charset=UTF-8'
+        self.set_header('Content-Type', content_type)
+        # the url changes with the content, the output can be kept by the browser (but not by shared caches)
+        self.set_header('Cache-Control', 'private, max-age=31536000, immutable')
+        self.finish(output.data)
+
+    def compute_etag(self):
+        return '"%s"' % self.digest
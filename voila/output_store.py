@@ -0,0 +1,132 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import base64
+import hashlib
+import html
+import time
+
+import nbformat
+from traitlets import Any, Float, Int
+from traitlets.config import LoggingConfigurable
+
+from .cache import LRUCache
+
+# the mime types of the outputs that are served by url when they are large, images are base64 encoded in notebooks
+IMAGE_MIMETYPES = ('image/png', 'image/jpeg')
+STORED_MIMETYPES = IMAGE_MIMETYPES + ('text/html',)
+
+
+class StoredOutput(object):
+    """The data of an output, served by OutputHandler."""
+
+    def __init__(self, data, mimetype):
+        self.data = data
+        self.mimetype = mimetype
+        # the kernels of the pages that show the output, and the time until which it is kept without them
+        self.kernels = set()
+        self.expires = 0
+
+
+class OutputStore(LoggingConfigurable):
+    """Keeps the large outputs of the rendered pages, which refer to them by url instead of inlining them.
+
+    Inlining a large image or html output (such as a DataFrame, or a plotly figure) makes the page large,
+    and blocks the browser while it parses it. Outputs of more than `threshold` bytes are kept here instead,
+    keyed by the hash of their content, so that an output shown by several pages is only kept once, and
+    cached by the browsers. An output is kept while the kernel of a page that showed it is running, and
+    for `ttl` seconds after it was last rendered, within the `max_size` memory budget.
+    """
+
+    threshold = Int(256 * 1024, help='''
+    Size in bytes above which an output is served by url instead of being inlined in the page (0 disables the store).
+    ''').tag(config=True)
+
+    max_size = Int(256 * 1024 * 1024, help='''
+    Memory budget in bytes of the output store.
+    ''').tag(config=True)
+
+    ttl = Float(600, help='''
+    Time in seconds an output is kept after it was last rendered, once the kernels of the pages that showed it are shut down.
+    ''').tag(config=True)
+
+    kernel_manager = Any(allow_none=True)
+
+    def __init__(self, **kwargs):
+        super(OutputStore, self).__init__(**kwargs)
+        self._cache = LRUCache(self.max_size)
+
+    @property
+    def enabled(self):
+        return self.threshold > 0 and self.max_size > 0
+
+    def put(self, data, mimetype, kernel_id=None):
+        """Keep the data of an output, returns its digest."""
+        digest = hashlib.sha256(mimetype.encode('utf-8') + b'\n' + data).hexdigest()
+        output = self._cache.peek(digest)
+        if output is None:
+            output = StoredOutput(data, mimetype)
+            self._cache.put(digest, output, len(data))
+        if kernel_id:
+            output.kernels.add(kernel_id)
+        output.expires = time.time() + self.ttl
+        return digest
+
+    def get(self, digest):
+        """Returns the StoredOutput with a digest, or None."""
+        output = self._cache.get(digest)
+        if output is None:
+            return None
+        if output.expires < time.time() and not self._has_running_kernels(output):
+            self._cache.pop(digest)
+            return None
+        return output
+
+    def _has_running_kernels(self, output):
+        if self.kernel_manager is None:
+            return False
+        output.kernels = {kernel_id for kernel_id in output.kernels if kernel_id in self.kernel_manager}
+        return bool(output.kernels)
+
+    def store_output(self, output, url_prefix, kernel_id=None):
+        """Returns the output, or a copy of it that refers to its large data by url.
+
+        The nbconvert templates show images from `metadata.filenames` when it is set, html outputs
+        are replaced by an element that is loaded by the page (see the voila_setup macro).
+        """
+        if not self.enabled or output.get('output_type') not in ('display_data', 'execute_result'):
+            return output
+        data = output.get('data', {})
+        urls = {}
+        for mimetype in STORED_MIMETYPES:
+            value = data.get(mimetype)
+            if not isinstance(value, str) or len(value) < self.threshold:
+                continue
+            raw = base64.b64decode(value) if mimetype in IMAGE_MIMETYPES else value.encode('utf-8')
+            urls[mimetype] = url_prefix + self.put(raw, mimetype, kernel_id)
+        if not urls:
+            return output
+        output = nbformat.NotebookNode(output)
+        output.data = nbformat.NotebookNode(data)
+        output.metadata = nbformat.NotebookNode(output.get('metadata', {}))
+        filenames = dict(output.metadata.get('filenames', {}))
+        for mimetype, url in urls.items():
+            if mimetype == 'text/html':
+                output.data[mimetype] = '<div class="voila-output" data-voila-output-url="{}"></div>'.format(html.escape(url))
+            else:
+                output.data[mimetype] = ''
+                filenames[mimetype] = url
+        if filenames:
+            output.metadata['filenames'] = filenames
+        return output
+
+    @property
+    def stats(self):
+        return self._cache.stats
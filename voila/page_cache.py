@@ -0,0 +1,171 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import asyncio
+import json
+import time
+import urllib.parse
+
+from tornado.ioloop import IOLoop
+from traitlets import Any, Int
+from traitlets.config import LoggingConfigurable
+
+from .cache import LRUCache
+
+
+def normalize_query(query):
+    """The query string with its arguments sorted, so that equivalent query strings give the same key."""
+    arguments = urllib.parse.parse_qsl(query, keep_blank_values=True)
+    return urllib.parse.urlencode(sorted(arguments))
+
+
+class CachedPage(object):
+    """The html of a rendered page, which expires after a time to live."""
+
+    def __init__(self, html, ttl):
+        self.html = html
+        # wall clock time, since it is shared with other processes by the SnapshotStore
+        self.expires = time.time() + ttl
+
+    @property
+    def expired(self):
+        return time.time() >= self.expires
+
+
+class PageCache(LoggingConfigurable):
+    """Keeps the html of the pages of notebooks that opted in, so that they are served without a kernel.
+
+    Entries are keyed by the path, modification time and size of the notebook, and by the
+    normalized query string. Concurrent renders of a page that is not cached are collapsed:
+    one request renders the page, the others wait for its html.
+
+    With a SnapshotStore, the pages are also kept on disk, and shared with other processes.
+    """
+
+    max_size = Int(64 * 1024 * 1024, help='''
+    Memory budget in bytes of the cached pages (0 disables the cache).
+    ''').tag(config=True)
+
+    # a SnapshotStore, or None
+    store = Any(allow_none=True)
+
+    def __init__(self, **kwargs):
+        super(PageCache, self).__init__(**kwargs)
+        self._cache = LRUCache(self.max_size)
+        # maps a key to the future of the page being rendered for it
+        self._pending = {}
+        # the paths of the notebooks that opted in from their metadata
+        self._opted_in = set()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def opted_in(self, path):
+        """Whether the metadata of a notebook set a page_cache_ttl, when it was last loaded."""
+        return path in self._opted_in
+
+    def set_opted_in(self, path, opted_in):
+        if opted_in:
+            self._opted_in.add(path)
+        else:
+            self._opted_in.discard(path)
+
+    def key(self, model, query):
+        """The cache key for a contents model, which can be fetched without its content, and a query string."""
+        return (model['path'], model.get('last_modified'), model.get('size'), normalize_query(query))
+
+    def get(self, key):
+        """Returns the html of a cached page, or None."""
+        page = self._cache.get(key)
+        if page is None:
+            return None
+        if page.expired:
+            self._cache.pop(key)
+            return None
+        return page.html
+
+    async def wait(self, key):
+        """Waits for a page that is being rendered, returns its html, or None when it is not rendered or fails."""
+        future = self._pending.get(key)
+        if future is None:
+            return None
+        return await asyncio.shield(future)
+
+    async def load(self, key):
+        """Returns the html of a page from the store, or None.
+
+        A page found in the store is cached in memory, and given to the requests waiting for it.
+        """
+        if self.store is None or not self.store.enabled:
+            return None
+        try:
+            entry = await IOLoop.current().run_in_executor(None, self.store.get, self._store_key(key))
+        except Exception:
+            self.log.exception('Could not load a page from the store')
+            return None
+        if entry is None:
+            return None
+        data, metadata = entry
+        ttl = metadata['expires'] - time.time()
+        if ttl <= 0:
+            return None
+        html = data.decode('utf-8')
+        self._cache.put(key, CachedPage(html, ttl), len(html))
+        self._resolve(key, html)
+        return html
+
+    def rendering(self, key):
+        """Marks a page as being rendered, until `put` or `discard` is called.
+
+        Returns False when the page is already being rendered by another request.
+        """
+        if key in self._pending:
+            return False
+        self._pending[key] = asyncio.get_event_loop().create_future()
+        return True
+
+    def put(self, key, html, ttl):
+        path = key[0]
+        # older versions of the notebook will never be requested again
+        for old_key in self._cache.keys():
+            if old_key[0] == path and old_key[1:3] != key[1:3]:
+                self._cache.pop(old_key)
+        page = CachedPage(html, ttl)
+        self._cache.put(key, page, len(html))
+        self.log.debug('Page cache: %(entries)d pages, %(size)d bytes, %(hits)d hits, %(misses)d misses', self._cache.stats)
+        self._resolve(key, html)
+        if self.store is not None and self.store.enabled:
+            asyncio.ensure_future(self._save(key, page))
+
+    async def _save(self, key, page):
+        try:
+            await IOLoop.current().run_in_executor(None, self.store.put, self._store_key(key), page.html.encode('utf-8'), {'expires': page.expires})
+        except Exception:
+            self.log.exception('Could not store a page')
+
+    def _store_key(self, key):
+        return 'page:' + json.dumps(key, default=str)
+
+    def discard(self, key):
+        """The page is not cached after all, the waiting requests render it themselves."""
+        self._resolve(key, None)
+
+    def _resolve(self, key, html):
+        future = self._pending.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(html)
+
+    def clear(self):
+        self._cache.clear()
+
+    @property
+    def stats(self):
+        return dict(self._cache.stats, rendering=len(self._pending))
@@ -0,0 +1,112 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import nbformat
+
+# the iopub messages that change the outputs of a cell
+OUTPUT_MSG_TYPES = {'stream', 'display_data', 'execute_result', 'error', 'update_display_data', 'clear_output'}
+
+
+class PartialOutputs(object):
+    """Streams the outputs of a cell while it is executed.
+
+    The outputs are rendered with the `outputs` block of the template, and written in containers
+    marked with the index of the cell, which are removed once the cell is rendered by the template.
+    New outputs are appended to what was written, as well as the text added to the last stream output
+    (see VoilaExecutor.coalesce_streams), unless the outputs were cleared or updated, in which case all
+    the outputs are written again. Only the first `max_outputs` outputs are written.
+    """
+
+    def __init__(self, context, cell, cell_index, write, strip_errors=True, max_outputs=100, store_output=None):
+        self.context = context
+        self.cell = cell
+        self.cell_index = cell_index
+        # writes and flushes a snippet of the page
+        self.write = write
+        # like VoilaExecutor.strip_code_cell_errors, errors and warnings are not shown
+        self.strip_errors = strip_errors
+        # rendering every output of a cell that displays thousands of them would slow down their execution
+        self.max_outputs = max_outputs
+        # returns the output to render, see VoilaHandler._store_output
+        self.store_output = store_output
+        # the output objects that were written, and the text of the last one
+        self.written = []
+        self.written_text = ''
+        # outputs were updated in place
+        self.updated = False
+
+    @classmethod
+    def can_render(cls, context):
+        resources = context.get('resources') or {}
+        include_output = resources.get('global_content_filter', {}).get('include_output', True)
+        return include_output and 'outputs' in context.blocks
+
+    def on_message(self, msg):
+        if msg['msg_type'] == 'update_display_data':
+            self.updated = True
+
+    async def update(self):
+        """Write the outputs that were not written yet, returns False if there were none."""
+        outputs = list(self.cell.outputs)
+        written = self.written
+        appended = not self.updated and len(outputs) >= len(written) and all(a is b for a, b in zip(outputs, written))
+        # the text of the last stream output that was written since
+        added_text = ''
+        if appended and written and len(written) <= self.max_outputs and written[-1].output_type == 'stream':
+            text = written[-1].text
+            if text.startswith(self.written_text):
+                added_text = text[len(self.written_text):]
+            else:
+                # a line was overwritten after a carriage return
+                appended = False
+        if appended and len(outputs) == len(written) and not added_text:
+            return False
+        snippets = []
+        if not appended:
+            snippets.append(self._remove_script())
+            written = []
+        new_outputs = [output for output in outputs[len(written):self.max_outputs] if not self._stripped(output)]
+        if added_text and not self._stripped(written[-1]):
+            new_outputs.insert(0, nbformat.v4.new_output('stream', name=written[-1].name, text=added_text))
+        if new_outputs:
+            if self.store_output is not None:
+                new_outputs = [self.store_output(output) for output in new_outputs]
+            cell = nbformat.NotebookNode(self.cell)
+            cell.outputs = new_outputs
+            html = await self._render(cell)
+            snippets.append('<div class="voila-partial-output" data-voila-cell="{index}">{html}</div>\n'
+                            '<script>window.voila_partial_output && voila_partial_output({index})</script>\n'
+                            .format(index=self.cell_index, html=html))
+        self.written = outputs
+        self.written_text = outputs[-1].text if outputs and outputs[-1].output_type == 'stream' else ''
+        self.updated = False
+        if not snippets:
+            return False
+        self.write(''.join(snippets))
+        return True
+
+    def _stripped(self, output):
+        if not self.strip_errors:
+            return False
+        return output.output_type == 'error' or (output.output_type == 'stream' and output.get('name') == 'stderr')
+
+    def remove(self):
+        """Remove the outputs that were written, before the cell is rendered."""
+        if self.written:
+            self.write(self._remove_script())
+            self.written = []
+
+    async def _render(self, cell):
+        context = self.context.derived({'cell': cell})
+        return ''.join([snippet async for snippet in self.context.blocks['outputs'][0](context)])
+
+    def _remove_script(self):
+        return ('<script>document.querySelectorAll(\'[data-voila-cell="{index}"]\').forEach(function(el) {{ el.remove() }})</script>\n'
+                .format(index=self.cell_index))
@@ -9,6 +9,7 @@
 
 import os
 import json
+import time
 
 from jupyter_core.paths import jupyter_path
 import nbconvert.exporters.templateexporter
@@ -18,6 +19,12 @@ ROOT = os.path.dirname(__file__)
 STATIC_ROOT = os.path.join(ROOT, 'static')
 # if the directory above us contains the following paths, it means we are installed in dev mode (pip install -e .)
 DEV_MODE = os.path.exists(os.path.join(ROOT, '../setup.py')) and os.path.exists(os.path.join(ROOT, '../share'))
+# resolved template hierarchies (and static files, see TemplateStaticFileHandler) are checked
+# for changes on the file system at most once per this number of seconds
+PATH_CHECK_INTERVAL = 1
+
+# maps (app_names, template_name, root_dirs) to (template_names, signature, last check time)
+_template_hierarchy_cache = {}
 
 
 def collect_template_paths(app_names, template_name='default', prune=False, root_dirs=None):
@@ -107,6 +114,38 @@ def _default_root_dirs():
 
 
 def _find_template_hierarchy(app_names, template_name, root_dirs):
+    """Returns the names of a template and its base templates, memoized until one of their conf.json files changes"""
+    key = (tuple(app_names), template_name, tuple(root_dirs))
+    now = time.monotonic()
+    cached = _template_hierarchy_cache.get(key)
+    if cached is not None:
+        template_names, signature, checked = cached
+        if now - checked < PATH_CHECK_INTERVAL:
+            return list(template_names)
+        if _conf_signature(app_names, template_names, root_dirs) == signature:
+            _template_hierarchy_cache[key] = (template_names, signature, now)
+            return list(template_names)
+    template_names = _resolve_template_hierarchy(app_names, template_name, root_dirs)
+    signature = _conf_signature(app_names, template_names, root_dirs)
+    _template_hierarchy_cache[key] = (template_names, signature, now)
+    return list(template_names)
+
+
+def _conf_signature(app_names, template_names, root_dirs):
+    # the modification times of all the conf.json files that were (or could have been) read
+    signature = []
+    for template_name in template_names:
+        for root_dir in root_dirs:
+            for app_name in app_names:
+                conf_file = os.path.join(root_dir, app_name, 'templates', template_name, 'conf.json')
+                try:
+                    signature.append(os.stat(conf_file).st_mtime_ns)
+                except OSError:
+                    signature.append(None)
+    return signature
+
+
+def _resolve_template_hierarchy(app_names, template_name, root_dirs):
     template_names = []
     while template_name is not None:
         template_names.append(template_name)
@@ -0,0 +1,78 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import concurrent.futures
+import multiprocessing
+import time
+
+from tornado.ioloop import IOLoop
+from traitlets import Int
+from traitlets.config import LoggingConfigurable
+
+
+class RenderPool(LoggingConfigurable):
+    """Renders the static parts of the notebooks in worker processes.
+
+    Converting the markdown cells to html and highlighting the inputs of the code cells is pure
+    CPU work, which holds the GIL of the server process, so that the websockets of every other
+    page stall during a large render. With worker processes, these fragments are converted
+    there (see VoilaExporter.generate_from_notebook_node), and the event loop only waits for them.
+    The worker processes are started on the first render.
+    """
+
+    processes = Int(0, help='''
+    Number of worker processes rendering the markdown cells and the inputs of the code cells (0 renders them in the server process).
+    ''').tag(config=True)
+
+    def __init__(self, **kwargs):
+        super(RenderPool, self).__init__(**kwargs)
+        self._executor = None
+        # maps the kinds of fragments to their number of renders, and total and maximum duration
+        self._stats = {}
+
+    @property
+    def enabled(self):
+        return self.processes > 0
+
+    async def run(self, name, func, *args):
+        """Call func in a worker process, func and its arguments must be picklable."""
+        started = time.monotonic()
+        executor = self._get_executor()
+        try:
+            return await IOLoop.current().run_in_executor(executor, func, *args)
+        except concurrent.futures.process.BrokenProcessPool:
+            # a worker died (e.g. it was killed), the next renders start new ones
+            if self._executor is executor:
+                self._executor = None
+            raise
+        finally:
+            self._record(name, time.monotonic() - started)
+
+    def _get_executor(self):
+        if self._executor is None:
+            # forking the server process would copy its threads and the sockets of the kernels
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.processes,
+                                                                    mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _record(self, name, duration):
+        stats = self._stats.setdefault(name, {'calls': 0, 'seconds': 0., 'max_seconds': 0.})
+        stats['calls'] += 1
+        stats['seconds'] += duration
+        stats['max_seconds'] = max(stats['max_seconds'], duration)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @property
+    def stats(self):
+        return {name: dict(stats) for name, stats in self._stats.items()}
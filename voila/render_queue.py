@@ -0,0 +1,134 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+import asyncio
+import collections
+import time
+
+from traitlets import Any
+from traitlets.config import LoggingConfigurable
+
+
+class RenderQueueFull(Exception):
+    """Raised when a render cannot be queued anymore"""
+
+
+class RenderTicket(object):
+    """A place in the render queue for a single request."""
+
+    def __init__(self, notebook_path):
+        self.notebook_path = notebook_path
+        self.queued = time.time()
+        self.admitted = asyncio.Future()
+        self.released = False
+
+    @property
+    def wait_time(self):
+        return time.time() - self.queued
+
+
+class RenderQueue(LoggingConfigurable):
+    """Limits the number of concurrent renders, globally and per notebook.
+
+    Requests that cannot be rendered right away wait in a bounded FIFO queue.
+    The limits are configured on `VoilaConfiguration`, where 0 means unlimited.
+    """
+    voila_configuration = Any()
+
+    def __init__(self, **kwargs):
+        super(RenderQueue, self).__init__(**kwargs)
+        self._queue = collections.deque()
+        self._running = collections.Counter()
+        self.running_total = 0
+        self.rejected = 0
+        self.admitted = 0
+        self.total_wait_time = 0.
+        self.max_wait_time = 0.
+
+    def enter(self, notebook_path):
+        """Returns a ticket for a render of a notebook, or raises RenderQueueFull.
+
+        The render can start once the `admitted` future of the ticket is done, and the
+        ticket should always be released (see `release`).
+        """
+        ticket = RenderTicket(notebook_path)
+        if self._can_run(notebook_path):
+            self._admit(ticket)
+        elif len(self._queue) < self.voila_configuration.render_queue_size:
+            self._queue.append(ticket)
+        else:
+            self.rejected += 1
+            self.log.warning('Render queue is full (%d renders running), rejecting render of %s, %d renders rejected so far',
+                             self.running_total, notebook_path, self.rejected)
+            raise RenderQueueFull()
+        return ticket
+
+    def position(self, ticket):
+        """Position of a ticket in the queue, starting at 1 (0 means it was admitted)."""
+        try:
+            return self._queue.index(ticket) + 1
+        except ValueError:
+            return 0
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def release(self, ticket):
+        """Give back the place of a ticket, calling this multiple times is allowed."""
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.admitted.done():
+            self._running[ticket.notebook_path] -= 1
+            self.running_total -= 1
+        else:
+            # the client went away while waiting
+            self._queue.remove(ticket)
+            ticket.admitted.cancel()
+        self._admit_waiting()
+
+    def _can_run(self, notebook_path):
+        config = self.voila_configuration
+        if config.max_concurrent_renders and self.running_total >= config.max_concurrent_renders:
+            return False
+        if config.max_concurrent_renders_per_notebook and self._running[notebook_path] >= config.max_concurrent_renders_per_notebook:
+            return False
+        return True
+
+    def _admit(self, ticket):
+        self._running[ticket.notebook_path] += 1
+        self.running_total += 1
+        self.admitted += 1
+        wait_time = ticket.wait_time
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        ticket.admitted.set_result(wait_time)
+
+    def _admit_waiting(self):
+        # FIFO, but a ticket for a notebook at its own limit does not block tickets for other notebooks
+        for ticket in list(self._queue):
+            if self._can_run(ticket.notebook_path):
+                self._queue.remove(ticket)
+                self._admit(ticket)
+                stats = self.stats
+                self.log.info('Render of %s admitted after waiting %.3f seconds in the queue, %d renders waiting '
+                              '(average wait %.3f seconds, max %.3f seconds)', ticket.notebook_path, ticket.admitted.result(),
+                              stats['depth'], stats['average_wait_time'], stats['max_wait_time'])
+
+    @property
+    def stats(self):
+        return {
+            'depth': self.depth,
+            'running': self.running_total,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'average_wait_time': self.total_wait_time / self.admitted if self.admitted else 0.,
+            'max_wait_time': self.max_wait_time,
+        }
@@ -7,20 +7,39 @@
 # The full license is in the file LICENSE, distributed with this software.  #
 #############################################################################
 
+import atexit
 import os
 import gettext
 
 from jinja2 import Environment, FileSystemLoader
+from tornado.ioloop import IOLoop
 
-from jupyter_server.utils import url_path_join
-from jupyter_server.base.handlers import path_regex, FileFindHandler
+from jupyter_server.utils import url_path_join, run_sync
+from jupyter_server.base.handlers import path_regex
 
 from .paths import ROOT, collect_template_paths, collect_static_paths, jupyter_path
 from .handler import VoilaHandler
 from .treehandler import VoilaTreeHandler
-from .static_file_handler import MultiStaticFileHandler, TemplateStaticFileHandler, WhiteListFileHandler
+from .output_handler import OutputHandler
+from .metrics_handler import MetricsHandler
+from .static_file_handler import MultiStaticFileHandler, TemplateStaticFileHandler, WhiteListFileHandler, NbextensionsFileHandler
 from .configuration import VoilaConfiguration
-from .utils import get_server_root_dir
+from .kernel_pool import KernelPool
+from .kernel_culler import KernelCuller
+from .render_queue import RenderQueue
+from .notebook_cache import NotebookCache
+from .image_cache import MarkdownImageCache
+from .markdown_cache import MarkdownCache
+from .page_cache import PageCache
+from .snapshots import SnapshotScheduler
+from .snapshot_store import SnapshotStore
+from .output_store import OutputStore
+from .io_executor import IOExecutor
+from .render_pool import RenderPool
+from .kernelspec_registry import KernelSpecRegistry
+from .cache import LRUCache
+from .static_cache import StaticAssetCache
+from .utils import get_server_root_dir, create_template_bytecode_cache
 
 
 def _jupyter_server_extension_paths():
@@ -45,8 +64,45 @@ def _load_jupyter_server_extension(server_app):
     static_paths = collect_static_paths(['voila', 'nbconvert'], template_name)
 
     jenv_opt = {"autoescape": True}
-    env = Environment(loader=FileSystemLoader(template_paths), extensions=['jinja2.ext.i18n'], **jenv_opt)
+    bytecode_cache_dir = voila_configuration.template_bytecode_cache_dir
+    env = Environment(loader=FileSystemLoader(template_paths), extensions=['jinja2.ext.i18n'],
+                      bytecode_cache=create_template_bytecode_cache(bytecode_cache_dir), **jenv_opt)
     web_app.settings['voila_jinja2_env'] = env
+    web_app.settings['voila_kernel_pool'] = KernelPool(parent=server_app, kernel_manager=server_app.kernel_manager)
+    web_app.settings['voila_kernel_culler'] = KernelCuller(
+        parent=server_app,
+        kernel_manager=server_app.kernel_manager,
+        voila_configuration=voila_configuration
+    )
+    web_app.settings['voila_render_queue'] = RenderQueue(parent=server_app, voila_configuration=voila_configuration)
+    web_app.settings['voila_notebook_cache'] = NotebookCache(parent=server_app)
+    web_app.settings['voila_markdown_image_cache'] = MarkdownImageCache(parent=server_app)
+    web_app.settings['voila_markdown_cache'] = MarkdownCache(parent=server_app)
+    snapshot_store = SnapshotStore(parent=server_app)
+    web_app.settings['voila_page_cache'] = PageCache(parent=server_app, store=snapshot_store)
+    web_app.settings['voila_io_executor'] = io_executor = IOExecutor(parent=server_app)
+    web_app.settings['voila_kernelspec_registry'] = KernelSpecRegistry(parent=server_app, kernel_spec_manager=server_app.kernel_spec_manager,
+                                                                       io_executor=io_executor)
+    snapshot_scheduler = SnapshotScheduler(
+        parent=server_app,
+        kernel_manager=server_app.kernel_manager,
+        contents_manager=server_app.contents_manager,
+        kernelspec_registry=web_app.settings['voila_kernelspec_registry'],
+        voila_configuration=voila_configuration,
+        io_executor=io_executor,
+        store=snapshot_store
+    )
+    web_app.settings['voila_snapshot_scheduler'] = snapshot_scheduler
+    web_app.settings['voila_output_store'] = OutputStore(parent=server_app, kernel_manager=server_app.kernel_manager)
+    web_app.settings['voila_render_pool'] = RenderPool(parent=server_app)
+    if snapshot_scheduler.enabled:
+        IOLoop.current().add_callback(snapshot_scheduler.start)
+    # exporters are keyed by template and theme, which can come from the query string, so their number is bounded
+    web_app.settings['voila_exporters'] = LRUCache(max_size=16)
+    web_app.settings['voila_template_bytecode_cache'] = create_template_bytecode_cache(bytecode_cache_dir, enable_async=True)
+    web_app.settings['voila_static_asset_cache'] = StaticAssetCache(parent=server_app)
+    # the server has no shutdown hook for its extensions, it shuts down the kernels before the process exits
+    atexit.register(_stop, web_app.settings)
 
     nbui = gettext.translation('nbui', localedir=os.path.join(ROOT, 'i18n'), fallback=True)
     env.install_gettext_translations(nbui, newstyle=False)
@@ -67,6 +123,8 @@ def _load_jupyter_server_extension(server_app):
         (url_path_join(base_url, '/voila/tree' + path_regex), VoilaTreeHandler, tree_handler_conf),
         (url_path_join(base_url, '/voila/templates/(.*)'), TemplateStaticFileHandler),
         (url_path_join(base_url, '/voila/static/(.*)'), MultiStaticFileHandler, {'paths': static_paths}),
+        (url_path_join(base_url, r'/voila/outputs/([0-9a-f]+)'), OutputHandler),
+        (url_path_join(base_url, r'/voila/metrics'), MetricsHandler),
         (
             url_path_join(base_url, r'/voila/files/(.*)'),
             WhiteListFileHandler,
@@ -86,19 +144,29 @@ def _load_jupyter_server_extension(server_app):
             nbextensions_path = web_app.settings['nbextensions_path']
         else:
             nbextensions_path = jupyter_path('nbextensions')
+        web_app.settings['voila_nbextensions_path'] = nbextensions_path
 
         web_app.add_handlers(host_pattern, [
             # this handler serves the nbextensions similar to the classical notebook
             (
                 url_path_join(base_url, r'/voila/nbextensions/(.*)'),
-                FileFindHandler,
+                NbextensionsFileHandler,
                 {
                     'path': nbextensions_path,
-                    'no_cache_paths': ['/'],  # don't cache anything in nbextensions
                 },
             )
         ])
 
 
+def _stop(settings):
+    """Stop the components of Voilà, like Voila.stop does for the standalone application."""
+    settings['voila_kernel_pool'].stop()
+    settings['voila_kernel_culler'].stop()
+    run_sync(settings['voila_snapshot_scheduler'].stop())
+    settings['voila_io_executor'].shutdown()
+    settings['voila_render_pool'].shutdown()
+    settings['voila_static_asset_cache'].stop()
+
+
 # For backward compatibility
 load_jupyter_server_extension = _load_jupyter_server_extension
@@ -0,0 +1,168 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from traitlets import Int, Unicode
+from traitlets.config import LoggingConfigurable
+
+
+class SnapshotStore(LoggingConfigurable):
+    """Keeps executed notebooks and rendered pages on disk, so that they survive restarts and are shared by processes.
+
+    The data is stored in content-addressed files (named by their sha256), and indexed by key in
+    an SQLite database, which also records when an entry was last used. When the files take more
+    than `max_size` bytes, the least recently used entries are removed. Several processes can use
+    the same directory: the files are written atomically, and the index is updated in transactions.
+
+    The methods are blocking, and should be called in an executor.
+    """
+
+    directory = Unicode('', help='''
+    Directory of the snapshot store (empty disables the store).
+    ''').tag(config=True)
+
+    max_size = Int(1024 * 1024 * 1024, help='''
+    Disk budget in bytes of the snapshot store.
+    ''').tag(config=True)
+
+    def __init__(self, **kwargs):
+        super(SnapshotStore, self).__init__(**kwargs)
+        self._initialized = False
+
+    @property
+    def enabled(self):
+        return bool(self.directory) and self.max_size > 0
+
+    @property
+    def blob_directory(self):
+        return os.path.join(self.directory, 'blobs')
+
+    def get(self, key):
+        """Returns the (data, metadata) of an entry, or None."""
+        with self._connect() as db:
+            row = db.execute('SELECT blob, metadata FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            blob, metadata = row
+            try:
+                with open(self._blob_path(blob), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                # the file was removed, by hand or by an eviction in another process
+                db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                return None
+            db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (time.time(), key))
+        return data, json.loads(metadata)
+
+    def put(self, key, data, metadata=None):
+        """Store the data of an entry, with a json serializable metadata dict."""
+        blob = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(blob)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write to a temporary file first, so that other processes never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        with self._connect() as db:
+            old_blobs = self._delete(db, key)
+            db.execute('INSERT INTO entries (key, blob, size, accessed, metadata) VALUES (?, ?, ?, ?, ?)',
+                       (key, blob, len(data), time.time(), json.dumps(metadata or {})))
+            self._remove_unused_blobs(db, old_blobs | self._evict(db))
+
+    def delete(self, key):
+        with self._connect() as db:
+            self._remove_unused_blobs(db, self._delete(db, key))
+
+    @property
+    def stats(self):
+        with self._connect(write=False) as db:
+            entries, = db.execute('SELECT COUNT(*) FROM entries').fetchone()
+            size = self._size(db)
+        return {'entries': entries, 'size': size}
+
+    def _size(self, db):
+        # entries with the same content share a file
+        size, = db.execute('SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT blob, size FROM entries)').fetchone()
+        return size
+
+    def _delete(self, db, key):
+        """Delete an entry from the index, returns the set of blobs it used."""
+        blobs = {blob for blob, in db.execute('SELECT blob FROM entries WHERE key = ?', (key,))}
+        db.execute('DELETE FROM entries WHERE key = ?', (key,))
+        return blobs
+
+    def _evict(self, db):
+        """Delete the least recently used entries until the budget is met, returns the set of blobs they used."""
+        blobs = set()
+        size = self._size(db)
+        if size <= self.max_size:
+            return blobs
+        for key, blob, entry_size in db.execute('SELECT key, blob, size FROM entries ORDER BY accessed').fetchall():
+            blobs |= self._delete(db, key)
+            # entries with the same content share a file, which is only freed with its last entry
+            if not self._blob_used(db, blob):
+                size -= entry_size
+            if size <= self.max_size:
+                break
+        return blobs
+
+    def _remove_unused_blobs(self, db, blobs):
+        for blob in blobs:
+            if not self._blob_used(db, blob):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._blob_path(blob))
+
+    def _blob_used(self, db, blob):
+        return db.execute('SELECT 1 FROM entries WHERE blob = ? LIMIT 1', (blob,)).fetchone() is not None
+
+    def _blob_path(self, blob):
+        return os.path.join(self.blob_directory, blob[:2], blob)
+
+    @contextlib.contextmanager
+    def _connect(self, write=True):
+        """A connection with a transaction, committed when the block exits without an exception.
+
+        A write transaction locks the database immediately, a read transaction only sees a
+        consistent snapshot of it, and does not wait for the writers.
+        """
+        if not self._initialized:
+            os.makedirs(self.directory, exist_ok=True)
+        db = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'), timeout=30, isolation_level=None)
+        try:
+            if not self._initialized:
+                # the write ahead log lets processes read while another one writes
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute('CREATE TABLE IF NOT EXISTS entries '
+                           '(key TEXT PRIMARY KEY, blob TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL, metadata TEXT NOT NULL)')
+                # the entries sharing a file are looked up on every eviction
+                db.execute('CREATE INDEX IF NOT EXISTS entries_blob ON entries (blob)')
+                self._initialized = True
+            db.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+        finally:
+            db.close()
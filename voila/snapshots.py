@@ -0,0 +1,248 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import asyncio
+import os
+import time
+
+from tornado.ioloop import IOLoop
+from traitlets import Any, Dict, Int
+from traitlets.config import LoggingConfigurable
+
+import nbformat
+from nbclient.exceptions import CellExecutionError
+from nbclient.util import ensure_async
+from nbconvert.preprocessors import ClearOutputPreprocessor
+
+from ._version import __version__
+from .execute import VoilaExecutor, strip_code_cell_warnings
+
+
+class Snapshot(object):
+    """A notebook executed in the background, which is rendered without a kernel."""
+
+    def __init__(self, notebook, last_modified, refreshed, duration):
+        self.notebook = notebook
+        # the modification time of the notebook file that was executed, as a string
+        self.last_modified = last_modified
+        # the time at which the refresh finished, and how long it took
+        self.refreshed = refreshed
+        self.duration = duration
+
+
+class SnapshotScheduler(LoggingConfigurable):
+    """Executes notebooks on a schedule, and keeps their latest snapshot.
+
+    The pages of these notebooks are rendered from their snapshot, without starting a kernel,
+    while the next snapshot is executed in the background (stale-while-revalidate). Until the
+    first snapshot is executed, and with the voila-live query argument, the pages are rendered
+    with a kernel as usual. At most `max_workers` notebooks are executed at the same time, so
+    that the refreshes leave room for the renders of the pages.
+
+    With a SnapshotStore, the snapshots are also kept on disk. A process then starts with the
+    stored snapshots, and does not execute a notebook that another process refreshed recently.
+    """
+
+    notebooks = Dict(help='''
+    Maps the paths of notebooks (relative to the root directory) to the interval in seconds
+    at which they are executed again.
+    Example: --SnapshotScheduler.notebooks="{'reports/sales.ipynb': 3600}"
+    ''').tag(config=True)
+
+    max_workers = Int(1, help='''
+    Maximum number of notebooks that are executed at the same time.
+    ''').tag(config=True)
+
+    kernel_manager = Any()
+    contents_manager = Any()
+    kernelspec_registry = Any()
+    voila_configuration = Any()
+    io_executor = Any()
+    # a SnapshotStore, or None
+    store = Any(allow_none=True)
+
+    def __init__(self, **kwargs):
+        super(SnapshotScheduler, self).__init__(**kwargs)
+        # maps the notebook paths to their latest Snapshot
+        self._snapshots = {}
+        # maps the notebook paths to the time, duration and error of their last refresh
+        self._refreshes = {}
+        self._timeouts = {}
+        # the refreshes that are running, or waiting for a worker
+        self._tasks = set()
+        self._workers = None
+
+    @property
+    def enabled(self):
+        return bool(self.notebooks)
+
+    def start(self):
+        """Execute the notebooks now, and then on their schedule."""
+        if self._workers is not None or not self.enabled:
+            return
+        self._workers = asyncio.Semaphore(self.max_workers)
+        for path in self.notebooks:
+            self._schedule(path, 0)
+
+    async def stop(self):
+        """Cancel the scheduled and running refreshes, the kernels of the running ones are shut down."""
+        self._workers = None
+        for timeout in self._timeouts.values():
+            IOLoop.current().remove_timeout(timeout)
+        self._timeouts.clear()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get(self, path):
+        """Returns the latest Snapshot of a notebook, or None."""
+        return self._snapshots.get(self._normalize(path))
+
+    def _normalize(self, path):
+        return os.path.normpath(path).replace(os.sep, '/').lstrip('/')
+
+    def _schedule(self, path, delay):
+        self._timeouts[path] = IOLoop.current().call_later(delay, self._start_refresh, path)
+
+    def _start_refresh(self, path):
+        self._timeouts.pop(path, None)
+        task = asyncio.ensure_future(self._refresh(path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, path):
+        workers = self._workers
+        interval = self.notebooks[path]
+        delay = interval
+        try:
+            stored = await self._load(path)
+            if stored is not None:
+                # serve the stored snapshot while it is refreshed, if it is not more recent than ours
+                current = self.get(path)
+                if current is None or current.refreshed < stored.refreshed:
+                    self._snapshots[self._normalize(path)] = stored
+            if stored is not None and stored.refreshed + interval > time.time():
+                # refreshed by another process, or before a restart
+                delay = stored.refreshed + interval - time.time()
+            else:
+                async with workers:
+                    await self.refresh(path)
+        finally:
+            if self._workers is workers:
+                self._schedule(path, delay)
+
+    async def _load(self, path):
+        """The snapshot of a notebook in the store, or None if it is not stored or the notebook was modified since."""
+        if self.store is None or not self.store.enabled:
+            return None
+        try:
+            entry = await self.io_executor.run('snapshot_store.get', self.store.get, self._store_key(path))
+            if entry is None:
+                return None
+            data, metadata = entry
+            model = await self.io_executor.run('contents.stat', self.contents_manager.get, path=path, content=False)
+            if str(model.get('last_modified')) != metadata['last_modified']:
+                return None
+            return Snapshot(nbformat.reads(data.decode('utf-8'), as_version=4), metadata['last_modified'], metadata['refreshed'], metadata['duration'])
+        except Exception:
+            self.log.exception('Could not load the stored snapshot of %s', path)
+            return None
+
+    async def _save(self, path, snapshot):
+        if self.store is None or not self.store.enabled:
+            return
+        data = nbformat.writes(snapshot.notebook).encode('utf-8')
+        metadata = {'last_modified': snapshot.last_modified, 'refreshed': snapshot.refreshed, 'duration': snapshot.duration}
+        try:
+            await self.io_executor.run('snapshot_store.put', self.store.put, self._store_key(path), data, metadata)
+        except Exception:
+            self.log.exception('Could not store the snapshot of %s', path)
+
+    def _store_key(self, path):
+        return 'notebook:' + self._normalize(path)
+
+    async def refresh(self, path):
+        """Execute a notebook, and keep it as its latest snapshot."""
+        started = time.time()
+        try:
+            notebook, last_modified = await self._execute(path)
+        except Exception as e:
+            # the previous snapshot, if any, is kept
+            self.log.exception('Could not refresh the snapshot of %s', path)
+            self._refreshes[path] = {'refreshed': time.time(), 'duration': time.time() - started, 'error': str(e)}
+            return
+        snapshot = Snapshot(notebook, last_modified, time.time(), time.time() - started)
+        self._snapshots[self._normalize(path)] = snapshot
+        self._refreshes[path] = {'refreshed': snapshot.refreshed, 'duration': snapshot.duration, 'error': None}
+        self.log.info('Refreshed the snapshot of %s in %.3f seconds', path, snapshot.duration)
+        await self._save(path, snapshot)
+
+    async def _execute(self, path):
+        # like VoilaHandler.load_notebook, on the event loop which owns the signature store of nbformat
+        model = await self.io_executor.call('contents.get', self.contents_manager.get, path=path)
+        if model.get('type') != 'notebook':
+            raise ValueError('%s is not a notebook' % path)
+        nb = model['content']
+        last_modified = str(model.get('last_modified'))
+        cwd = os.path.dirname(path)
+        env = os.environ.copy()
+        env.update({
+            'SCRIPT_NAME': '',
+            'PATH_INFO': '',
+            'QUERY_STRING': '',
+            'SERVER_SOFTWARE': 'voila/{}'.format(__version__),
+        })
+        kernel_id = await ensure_async(self.kernel_manager.start_kernel(
+            kernel_name=await self._kernel_name(nb),
+            path=cwd,
+            env=env,
+        ))
+        try:
+            km = self.kernel_manager.get_kernel(kernel_id)
+            executor = VoilaExecutor(nb, km=km, config=self.config)
+            executor.kc = km.client()
+            await ensure_async(executor.kc.start_channels())
+            try:
+                await ensure_async(executor.kc.wait_for_ready(timeout=executor.startup_timeout))
+                executor.kc.allow_stdin = False
+                nb, resources = ClearOutputPreprocessor().preprocess(nb, {'metadata': {'path': cwd}})
+                # like the cells rendered by VoilaHandler, the execution stops at the first error
+                for cell_idx, cell in enumerate(nb.cells):
+                    try:
+                        await executor.execute_cell(cell, None, cell_idx, store_history=False)
+                    except TimeoutError:
+                        break
+                    except CellExecutionError:
+                        if executor.should_strip_error():
+                            strip_code_cell_warnings(cell)
+                            executor.strip_code_cell_errors(cell)
+                        break
+            finally:
+                executor.kc.stop_channels()
+        finally:
+            await ensure_async(self.kernel_manager.shutdown_kernel(kernel_id))
+        return nb, last_modified
+
+    async def _kernel_name(self, nb):
+        kernelspec = nb.metadata.get('kernelspec', {})
+        kernel_name = kernelspec.get('name', self.kernel_manager.default_kernel_name)
+        kernel_specs = await self.kernelspec_registry.get_all_specs()
+        if kernel_name not in kernel_specs:
+            # the same fallback as VoilaHandler.fix_notebook
+            language = kernelspec.get('language', '').lower()
+            kernel_name = self.voila_configuration.language_kernel_mapping.get(language) or \
+                await self.kernelspec_registry.find_kernel_name(language)
+        return kernel_name
+
+    @property
+    def stats(self):
+        """The time, duration and error of the last refresh of each notebook."""
+        return {path: dict(refresh) for path, refresh in self._refreshes.items()}
@@ -0,0 +1,188 @@
+#############################################################################
+# Copyright (c) 2018, Voilà Contributors                                    #
+# Copyright (c) 2018, QuantStack                                            #
+#                                                                           #
+# Distributed under the terms of the BSD 3-Clause License.                  #
+#                                                                           #
+# The full license is in the file LICENSE, distributed with this software.  #
+#############################################################################
+
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+from traitlets import Float, Int
+from traitlets.config import LoggingConfigurable
+
+from .cache import LRUCache
+from .compression import brotli
+
+# file extensions of the precompressed variants that can be found next to a static file
+COMPRESSED_EXTENSIONS = {
+    'gzip': '.gz',
+    'br': '.br',
+}
+
+
+def find_static_file(roots, path):
+    """Returns the root and absolute path of the first root containing a file, or (None, None)."""
+    for root in roots:
+        abspath = os.path.abspath(os.path.join(root, path))
+        if os.path.exists(abspath):
+            return root, abspath
+    return None, None
+
+
+class StaticAsset(object):
+    """The content of a static file, with what is needed to serve it."""
+
+    def __init__(self, root, abspath, data, stat_result, modified, resolve):
+        self.root = root
+        self.abspath = abspath
+        self.data = data
+        self.size = len(data)
+        # same as tornado's StaticFileHandler.get_content_version, used for the ETag
+        self.hash = hashlib.sha512(data).hexdigest()
+        self.mtime_ns = stat_result.st_mtime_ns
+        self.modified = modified
+        # returns the absolute path the file would be found at now
+        self.resolve = resolve
+        # maps content encodings to (data, hash) tuples
+        self.encodings = {}
+
+
+def is_compressible(path):
+    mime_type, encoding = mimetypes.guess_type(path)
+    if encoding is not None or mime_type is None:
+        return False
+    return mime_type.startswith('text/') or mime_type in [
+        'application/javascript', 'application/json', 'application/xml', 'image/svg+xml', 'application/wasm'
+    ]
+
+
+class StaticAssetCache(LoggingConfigurable):
+    """Keeps small and medium static files in memory, so that frequently requested files are served without touching the disk.
+
+    The cached files are checked against the file system in the background, every `check_interval` seconds.
+    A file that was modified, removed, or is now shadowed by a file in a root with higher precedence
+    is dropped from the cache, and read again on the next request.
+    """
+
+    max_size = Int(32 * 1024 * 1024, help='''
+    Memory budget in bytes for the cached static files (0 disables the cache).
+    ''').tag(config=True)
+
+    max_file_size = Int(8 * 1024 * 1024, help='''
+    Static files larger than this number of bytes are not cached.
+    ''').tag(config=True)
+
+    check_interval = Float(2, help='''
+    Interval in seconds at which the cached static files are checked for modifications.
+    ''').tag(config=True)
+
+    compression_min_size = Int(1024, help='''
+    Text files (such as JavaScript and CSS) larger than this number of bytes get gzip (and brotli if installed)
+    variants, served to the clients that accept them. Precompressed .gz and .br files next to a file are used if present.
+    ''').tag(config=True)
+
+    gzip_level = Int(9, help='''
+    Compression level for the gzip variants (1-9).
+    ''').tag(config=True)
+
+    brotli_quality = Int(11, help='''
+    Compression quality for the brotli variants (0-11).
+    ''').tag(config=True)
+
+    def __init__(self, **kwargs):
+        super(StaticAssetCache, self).__init__(**kwargs)
+        self._cache = LRUCache(self.max_size)
+        self._callback = None
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def load(self, key, root, abspath, modified, resolve):
+        """Read a static file into the cache, returns None if it should not be cached.
+
+        The compressed variants are created in a background thread, until then the file is sent uncompressed.
+        """
+        stat_result = os.stat(abspath)
+        if stat_result.st_size > self.max_file_size:
+            return None
+        with open(abspath, 'rb') as f:
+            data = f.read()
+        asset = StaticAsset(root, abspath, data, stat_result, modified, resolve)
+        self._cache.put(key, asset, asset.size)
+        if asset.size >= self.compression_min_size and is_compressible(abspath):
+            future = IOLoop.current().run_in_executor(None, self._compress, asset)
+            future.add_done_callback(lambda future: self._add_encodings(key, asset, future))
+        self._start()
+        return asset
+
+    def _compress(self, asset):
+        # runs in a thread, returns the encodings to add to the asset
+        compressors = {'gzip': lambda data: gzip.compress(data, compresslevel=self.gzip_level)}
+        if brotli is not None:
+            compressors['br'] = lambda data: brotli.compress(data, quality=self.brotli_quality)
+        encodings = {}
+        for encoding, compress in compressors.items():
+            data = self._read_precompressed(asset, encoding)
+            if data is None:
+                data = compress(asset.data)
+            if len(data) < asset.size:
+                encodings[encoding] = (data, '%s-%s' % (asset.hash, encoding))
+        return encodings
+
+    def _add_encodings(self, key, asset, future):
+        if future.exception() is not None:
+            self.log.error('Error while compressing %s', asset.abspath, exc_info=future.exception())
+            return
+        asset.encodings = future.result()
+        # the variants count in the memory budget too
+        if self._cache.peek(key) is asset:
+            self._cache.put(key, asset, asset.size + sum(len(data) for data, hash in asset.encodings.values()))
+
+    def _read_precompressed(self, asset, encoding):
+        path = asset.abspath + COMPRESSED_EXTENSIONS[encoding]
+        try:
+            if os.stat(path).st_mtime_ns < asset.mtime_ns:
+                self.log.warning('Ignoring %s, which is older than %s', path, asset.abspath)
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _start(self):
+        if self._callback is None:
+            self._callback = PeriodicCallback(self.revalidate, 1000 * self.check_interval)
+            self._callback.start()
+
+    def stop(self):
+        if self._callback is not None:
+            self._callback.stop()
+            self._callback = None
+
+    def revalidate(self):
+        for key, asset in self._cache.items():
+            try:
+                abspath = asset.resolve()
+                stat_result = os.stat(abspath) if abspath else None
+            except OSError:
+                stat_result = None
+            if abspath != asset.abspath or stat_result is None or \
+                    stat_result.st_mtime_ns != asset.mtime_ns or stat_result.st_size != asset.size:
+                self.log.debug('Static file %s changed, removing it from the cache', asset.abspath)
+                self._cache.pop(key)
+
+    @property
+    def stats(self):
+        return self._cache.stats
@@ -7,15 +7,175 @@
 # The full license is in the file LICENSE, distributed with this software.  #
 #############################################################################
 
+import functools
+import hashlib
 import os
 import re
+import time
 
 import tornado.web
+from tornado.log import gen_log
 
-from .paths import collect_static_paths
+from jupyter_server.base.handlers import FileFindHandler
+from ipython_genutils.path import filefind
 
+from .paths import PATH_CHECK_INTERVAL, collect_static_paths
+from .compression import accepted_encodings
+from .static_cache import find_static_file
 
-class TemplateStaticFileHandler(tornado.web.StaticFileHandler):
+
+class VersionedUrlMixin(object):
+    """Caches the responses to versioned urls forever.
+
+    A url is versioned when its `v` argument is the hash of the current content of the
+    file (see `make_static_url`), so it changes whenever the content changes.
+    """
+    CACHE_MAX_AGE = 365 * 24 * 60 * 60
+    versioned = False
+    # maps absolute paths to (modification time, size, version), unlike in the base class
+    # the version of a modified file is computed again
+    _versions = {}
+
+    def current_version(self):
+        return self._get_cached_version(self.absolute_path)
+
+    def get_cache_time(self, path, modified, mime_type):
+        if 'v' not in self.request.arguments:
+            return super(VersionedUrlMixin, self).get_cache_time(path, modified, mime_type)
+        # an outdated url should not cache the current content
+        version = self.current_version()
+        self.versioned = version is not None and self.get_query_argument('v') == version
+        return self.CACHE_MAX_AGE if self.versioned else 0
+
+    def set_headers(self):
+        super(VersionedUrlMixin, self).set_headers()
+        if self.versioned:
+            self.set_header('Cache-Control', 'public, max-age=%d, immutable' % self.CACHE_MAX_AGE)
+
+    @classmethod
+    def _get_cached_version(cls, abs_path):
+        try:
+            stat_result = os.stat(abs_path)
+        except OSError:
+            return None
+        signature = (stat_result.st_mtime_ns, stat_result.st_size)
+        with cls._lock:
+            cached = cls._versions.get(abs_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            version = cls.get_content_version(abs_path)
+        except OSError:
+            gen_log.error('Could not open static file %r', abs_path)
+            return None
+        with cls._lock:
+            cls._versions[abs_path] = (signature, version)
+        return version
+
+
+class StaticAssetMixin(VersionedUrlMixin):
+    """Serves static files from memory, using the StaticAssetCache in the `voila_static_asset_cache` setting.
+
+    A cached file can have precompressed variants, the one matching the Accept-Encoding
+    header of the request is sent, so that nothing is compressed per request.
+    Subclasses give the roots the files are looked up in (see `asset_roots`), and can change
+    how a path is resolved again when the cache checks for changes (see `asset_resolver`).
+    """
+    asset_cache = None
+    asset = None
+    asset_encoding = None
+
+    def asset_roots(self):
+        return ()
+
+    def asset_resolver(self, path):
+        """Returns a function that gives the absolute path the file would be served from now."""
+        return functools.partial(self.get_absolute_path, self.root, path)
+
+    async def get(self, path, include_body=True):
+        cache = self.settings.get('voila_static_asset_cache')
+        if cache is not None and cache.enabled:
+            self.asset_cache = cache
+            self.asset = cache.get((type(self).__name__, self.asset_roots(), path))
+            self.asset_key = path
+        return await super(StaticAssetMixin, self).get(path, include_body=include_body)
+
+    def validate_absolute_path(self, root, absolute_path):
+        if self.asset is not None and absolute_path == self.asset.abspath:
+            # it was validated when it was cached
+            self._select_asset_encoding()
+            return absolute_path
+        self.asset = None
+        resolved_path = absolute_path
+        absolute_path = super(StaticAssetMixin, self).validate_absolute_path(root, absolute_path)
+        # a directory is served with its default_filename, we only cache files that are requested directly
+        if absolute_path is not None and absolute_path == resolved_path and self.asset_cache is not None:
+            self.absolute_path = absolute_path
+            modified = super(StaticAssetMixin, self).get_modified_time()
+            key = (type(self).__name__, self.asset_roots(), self.asset_key)
+            self.asset = self.asset_cache.load(key, getattr(self, 'root', None), absolute_path, modified, self.asset_resolver(self.path))
+            self._select_asset_encoding()
+        return absolute_path
+
+    def _select_asset_encoding(self):
+        self.asset_encoding = None
+        if self.asset is None or not self.asset.encodings:
+            return
+        accepted = accepted_encodings(self.request.headers.get('Accept-Encoding', ''))
+        for encoding in ['br', 'gzip']:
+            if encoding in self.asset.encodings and accepted.get(encoding, 0) > 0:
+                self.asset_encoding = encoding
+                return
+
+    def _asset_content(self):
+        if self.asset_encoding is not None:
+            return self.asset.encodings[self.asset_encoding]
+        return self.asset.data, self.asset.hash
+
+    def set_extra_headers(self, path):
+        super(StaticAssetMixin, self).set_extra_headers(path)
+        if self.asset is not None and self.asset.encodings:
+            self.set_header('Vary', 'Accept-Encoding')
+            if self.asset_encoding is not None:
+                self.set_header('Content-Encoding', self.asset_encoding)
+
+    def current_version(self):
+        if self.asset is not None:
+            return self.asset.hash
+        return super(StaticAssetMixin, self).current_version()
+
+    def get_modified_time(self):
+        if self.asset is not None:
+            return self.asset.modified
+        return super(StaticAssetMixin, self).get_modified_time()
+
+    def get_content_size(self):
+        if self.asset is not None:
+            return len(self._asset_content()[0])
+        return super(StaticAssetMixin, self).get_content_size()
+
+    def compute_etag(self):
+        if self.asset is not None:
+            return '"%s"' % self._asset_content()[1]
+        return super(StaticAssetMixin, self).compute_etag()
+
+    def get_content(self, abspath, start=None, end=None):
+        # an instance method, unlike in the base class, so that cached files can be served
+        if self.asset is not None and abspath == self.asset.abspath:
+            return self._asset_content()[0][start:end]
+        return tornado.web.StaticFileHandler.get_content(abspath, start, end)
+
+    @classmethod
+    def get_content_version(cls, abspath):
+        # the base class would call get_content, which is not a class method here
+        hasher = hashlib.sha512()
+        with open(abspath, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+
+class TemplateStaticFileHandler(StaticAssetMixin, tornado.web.StaticFileHandler):
     """Static file handler that serves the static files for the template system.
 
     URL paths should be of the form <`template_name>/static/<path>`
@@ -27,6 +187,9 @@ class TemplateStaticFileHandler(tornado.web.StaticFileHandler):
     For this sytem, we don't need to use the root, since this is handled in the
     paths module.
     """
+    # maps (template, relative path) to the absolute path of a static file, and the time it was looked up
+    _absolute_paths = {}
+
     def initialize(self):
         super().initialize(path='/fake-root/voila-template-system/')
 
@@ -40,6 +203,8 @@ class TemplateStaticFileHandler(tornado.web.StaticFileHandler):
         return super().parse_url_path(path)
 
     def validate_absolute_path(self, root: str, absolute_path: str):
+        if self.asset is not None and absolute_path == self.asset.abspath:
+            return super().validate_absolute_path(root, absolute_path)
         # Instead of comparing to 1 root (self.root), which we don't use
         # we compare it to all the roots, and only 1 combinations has to be valid
         last_exception = None
@@ -55,18 +220,23 @@ class TemplateStaticFileHandler(tornado.web.StaticFileHandler):
     def get_absolute_path(cls, root, path):
         template, static, relpath = os.path.normpath(path).split(os.path.sep, 2)
         assert static == 'static'
+        now = time.monotonic()
+        cached = cls._absolute_paths.get((template, relpath))
+        if cached is not None and now - cached[1] < PATH_CHECK_INTERVAL:
+            return cached[0]
         roots = collect_static_paths(['voila', 'nbconvert'], template)
         for root in roots:
             abspath = os.path.abspath(os.path.join(root, relpath))
             if os.path.exists(abspath):
+                # only existing files are remembered, so their number is bounded
+                cls._absolute_paths[(template, relpath)] = (abspath, now)
                 return abspath
-                break
         # if we didn't find it, we will simply return an invalid path
         # which will lead to a 404
         return abspath
 
 
-class MultiStaticFileHandler(tornado.web.StaticFileHandler):
+class MultiStaticFileHandler(StaticAssetMixin, tornado.web.StaticFileHandler):
     """A static file handler that 'merges' a list of directories
 
     If initialized like this::
@@ -76,14 +246,24 @@ class MultiStaticFileHandler(tornado.web.StaticFileHandler):
         ])
 
     A file will be looked up in /var/1 first, then in /var/2.
-
     """
 
     def initialize(self, paths, default_filename=None):
         self.roots = paths
         super(MultiStaticFileHandler, self).initialize(path=paths[0], default_filename=default_filename)
 
+    def asset_roots(self):
+        return tuple(self.roots)
+
+    def asset_resolver(self, path):
+        # get_absolute_path returns the cached file, and changes self.root
+        roots = tuple(self.roots)
+        return lambda: find_static_file(roots, path)[1]
+
     def get_absolute_path(self, root, path):
+        if self.asset is not None:
+            self.root = self.asset.root
+            return self.asset.abspath
         # find the first absolute path that exists
         self.root = self.roots[0]
         for root in self.roots:
@@ -94,7 +274,31 @@ class MultiStaticFileHandler(tornado.web.StaticFileHandler):
         return abspath
 
 
-class WhiteListFileHandler(tornado.web.StaticFileHandler):
+def find_nbextension(roots, path):
+    """Returns the absolute path of an nbextension file, or None."""
+    try:
+        return os.path.abspath(filefind(path, roots))
+    except IOError:
+        return None
+
+
+class NbextensionsFileHandler(StaticAssetMixin, FileFindHandler):
+    """Serves the nbextensions from the nbextensions paths, like the classic notebook."""
+
+    def asset_roots(self):
+        return self.root
+
+    def asset_resolver(self, path):
+        # FileFindHandler.get_absolute_path remembers the paths it found forever
+        return functools.partial(find_nbextension, self.root, path)
+
+    @classmethod
+    def get_version(cls, settings, path):
+        abspath = find_nbextension(settings['static_path'], path)
+        return cls._get_cached_version(abspath) if abspath else None
+
+
+class WhiteListFileHandler(VersionedUrlMixin, tornado.web.StaticFileHandler):
     def initialize(self, whitelist=[], blacklist=[], **kwargs):
         self.whitelist = whitelist
         self.blacklist = blacklist
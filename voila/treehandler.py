@@ -13,6 +13,7 @@ from tornado import web
 from jupyter_server.base.handlers import JupyterHandler
 from jupyter_server.utils import url_path_join, url_escape
 
+from .io_executor import IOExecutor
 from .utils import get_server_root_dir
 
 
@@ -47,16 +48,18 @@ class VoilaTreeHandler(JupyterHandler):
             return 'Voilà Home'
 
     @web.authenticated
-    def get(self, path=''):
+    async def get(self, path=''):
         cm = self.contents_manager
+        # the contents manager reads the file system, which is done in a thread pool
+        io_executor = self.settings.get('voila_io_executor') or IOExecutor(max_workers=0)
 
-        if cm.dir_exists(path=path):
-            if cm.is_hidden(path) and not cm.allow_hidden:
+        if await io_executor.run('tree', cm.dir_exists, path=path):
+            if await io_executor.run('tree', cm.is_hidden, path) and not cm.allow_hidden:
                 self.log.info("Refusing to serve hidden directory, via 404 Error")
                 raise web.HTTPError(404)
             breadcrumbs = self.generate_breadcrumbs(path)
             page_title = self.generate_page_title(path)
-            contents = cm.get(path)
+            contents = await io_executor.run('tree', cm.get, path)
 
             def allowed_content(content):
                 if content['type'] in ['directory', 'notebook']:
@@ -72,9 +75,9 @@ class VoilaTreeHandler(JupyterHandler):
                        contents=contents,
                        terminals_available=False,
                        server_root=get_server_root_dir(self.settings)))
-        elif cm.file_exists(path):
+        elif await io_executor.run('tree', cm.file_exists, path):
             # it's not a directory, we have redirecting to do
-            model = cm.get(path, content=False)
+            model = await io_executor.run('tree', cm.get, path, content=False)
             # redirect to /api/notebooks if it's a notebook, otherwise /api/files
             service = 'notebooks' if model['type'] == 'notebook' else 'files'
             url = url_path_join(
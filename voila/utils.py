@@ -8,6 +8,9 @@
 #############################################################################
 
 import os
+import tempfile
+
+from jinja2 import FileSystemBytecodeCache
 
 
 def get_server_root_dir(settings):
@@ -24,3 +27,36 @@ def get_server_root_dir(settings):
         # collapse $HOME to ~
         root_dir = '~' + root_dir[len(home):]
     return root_dir
+
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """Jinja bytecode cache that can be shared by processes.
+
+    Jinja invalidates a cached template when the checksum of its source changes. The cache
+    files are written atomically, so that another process never reads a partially written file.
+    """
+
+    def dump_bytecode(self, bucket):
+        name = self._get_cache_filename(bucket)
+        fd, temp_name = tempfile.mkstemp(prefix=os.path.basename(name), dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                bucket.write_bytecode(f)
+            os.replace(temp_name, name)
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+
+
+def create_template_bytecode_cache(directory, enable_async=False):
+    """Returns a bytecode cache for Jinja environments, or None if no directory is given.
+
+    Templates compiled for an async environment are different, so they are cached in separate files.
+    """
+    if not directory:
+        return None
+    directory = os.path.expanduser(directory)
+    os.makedirs(directory, exist_ok=True)
+    pattern = '__voila_async_%s.cache' if enable_async else '__voila_%s.cache'
+    return TemplateBytecodeCache(directory, pattern)